@@ -0,0 +1,40 @@
+"""Add full-text search vector to products
+
+Revision ID: h2i3j4k5l6m7
+Revises: g1h2i3j4k5l6
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'h2i3j4k5l6m7'
+down_revision: Union[str, None] = 'g1h2i3j4k5l6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    # A stored generated column is computed for every existing row when it is
+    # added, so this also backfills the search document for the current catalog
+    op.add_column(
+        'products',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_DOCUMENT, persisted=True), nullable=True)
+    )
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_search_vector', table_name='products')
+    op.drop_column('products', 'search_vector')
@@ -0,0 +1,47 @@
+"""Add composite indexes for keyset pagination
+
+Revision ID: i3j4k5l6m7n8
+Revises: h2i3j4k5l6m7
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'i3j4k5l6m7n8'
+down_revision: Union[str, None] = 'h2i3j4k5l6m7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) - list endpoints seek on (created_at, id),
+# optionally scoped by the owner column each role filters on
+KEYSET_INDEXES = [
+    ('ix_products_created_at_id', 'products', ['created_at', 'id']),
+    ('ix_products_vendor_created_at_id', 'products', ['vendor_id', 'created_at', 'id']),
+    ('ix_rental_orders_created_at_id', 'rental_orders', ['created_at', 'id']),
+    ('ix_rental_orders_customer_created_at_id', 'rental_orders', ['customer_id', 'created_at', 'id']),
+    ('ix_rental_orders_vendor_created_at_id', 'rental_orders', ['vendor_id', 'created_at', 'id']),
+    ('ix_invoices_created_at_id', 'invoices', ['created_at', 'id']),
+    ('ix_invoices_customer_created_at_id', 'invoices', ['customer_id', 'created_at', 'id']),
+    ('ix_quotations_created_at_id', 'quotations', ['created_at', 'id']),
+    ('ix_quotations_customer_created_at_id', 'quotations', ['customer_id', 'created_at', 'id']),
+    ('ix_quotations_vendor_created_at_id', 'quotations', ['vendor_id', 'created_at', 'id']),
+    ('ix_wallet_transactions_created_at_id', 'wallet_transactions', ['created_at', 'id']),
+    ('ix_wallet_transactions_wallet_created_at_id', 'wallet_transactions', ['wallet_id', 'created_at', 'id']),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in KEYSET_INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(KEYSET_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,44 @@
+"""Store product attributes as JSONB with a GIN index
+
+Revision ID: j4k5l6m7n8o9
+Revises: i3j4k5l6m7n8
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'j4k5l6m7n8o9'
+down_revision: Union[str, None] = 'i3j4k5l6m7n8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'products', 'attributes',
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        postgresql_using='attributes::jsonb'
+    )
+    # jsonb_path_ops only supports @>, which is all the attribute filter uses,
+    # and is smaller and faster than the default jsonb_ops
+    op.create_index(
+        'ix_products_attributes', 'products', ['attributes'],
+        postgresql_using='gin', postgresql_ops={'attributes': 'jsonb_path_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_attributes', table_name='products')
+    op.alter_column(
+        'products', 'attributes',
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        postgresql_using='attributes::json'
+    )
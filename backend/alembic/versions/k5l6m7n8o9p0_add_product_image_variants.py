@@ -0,0 +1,26 @@
+"""Add image_variants to products
+
+Revision ID: k5l6m7n8o9p0
+Revises: j4k5l6m7n8o9
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'k5l6m7n8o9p0'
+down_revision: Union[str, None] = 'j4k5l6m7n8o9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'image_variants')
@@ -0,0 +1,44 @@
+"""Index reservations for interval queries and backfill open orders
+
+Revision ID: l6m7n8o9p0q1
+Revises: k5l6m7n8o9p0
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'l6m7n8o9p0q1'
+down_revision: Union[str, None] = 'k5l6m7n8o9p0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_reservations_active_window', 'reservations', ['product_id', 'reserved_to', 'reserved_from'],
+        postgresql_where=sa.text("status = 'ACTIVE'")
+    )
+    op.create_index('ix_reservations_order_id', 'reservations', ['order_id'])
+
+    # Nothing wrote reservations before, so derive them from orders still holding stock
+    op.execute("""
+        INSERT INTO reservations (id, product_id, order_id, reserved_from, reserved_to, quantity, status)
+        SELECT gen_random_uuid(), l.product_id, l.order_id, l.rental_start_date, l.rental_end_date, l.quantity, 'ACTIVE'
+        FROM order_lines l
+        JOIN rental_orders o ON o.id = l.order_id
+        WHERE o.status IN ('PENDING', 'CONFIRMED', 'PICKED_UP', 'ACTIVE')
+          AND l.product_id IS NOT NULL
+          AND l.rental_start_date IS NOT NULL
+          AND l.rental_end_date IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM reservations r WHERE r.order_id = l.order_id)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reservations_order_id', table_name='reservations')
+    op.drop_index('ix_reservations_active_window', table_name='reservations')
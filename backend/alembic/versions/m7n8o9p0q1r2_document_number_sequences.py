@@ -0,0 +1,32 @@
+"""Add sequences for order, invoice and quotation numbers
+
+Revision ID: m7n8o9p0q1r2
+Revises: l6m7n8o9p0q1
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'm7n8o9p0q1r2'
+down_revision: Union[str, None] = 'l6m7n8o9p0q1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Numbers each worker reserves per nextval(); change later with
+# ALTER SEQUENCE ... INCREMENT BY, the app reads it from pg_sequences
+BLOCK_SIZE = 50
+SEQUENCES = ['order_number_seq', 'invoice_number_seq', 'quotation_number_seq']
+
+
+def upgrade() -> None:
+    for name in SEQUENCES:
+        op.execute(f"CREATE SEQUENCE {name} START WITH 1 INCREMENT BY {BLOCK_SIZE} MINVALUE 1")
+
+
+def downgrade() -> None:
+    for name in SEQUENCES:
+        op.execute(f"DROP SEQUENCE IF EXISTS {name}")
@@ -0,0 +1,45 @@
+"""Add outbox_messages for side effects run by the outbox worker
+
+Revision ID: n8o9p0q1r2s3
+Revises: m7n8o9p0q1r2
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'n8o9p0q1r2s3'
+down_revision: Union[str, None] = 'm7n8o9p0q1r2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_messages',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('topic', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('status', sa.Enum('PENDING', 'DONE', 'DEAD', name='outboxstatus'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_outbox_messages_due', 'outbox_messages', ['available_at'],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_messages_due', table_name='outbox_messages')
+    op.drop_table('outbox_messages')
+    op.execute("DROP TYPE IF EXISTS outboxstatus")
@@ -0,0 +1,33 @@
+"""Track overdue days and accrued late fees on rental orders
+
+Revision ID: o9p0q1r2s3t4
+Revises: n8o9p0q1r2s3
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'o9p0q1r2s3t4'
+down_revision: Union[str, None] = 'n8o9p0q1r2s3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('rental_orders', sa.Column('overdue_days', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('rental_orders', sa.Column('accrued_late_fee', sa.Float(), server_default='0', nullable=False))
+    op.create_index(
+        'ix_rental_orders_out_end_date', 'rental_orders', ['rental_end_date'],
+        postgresql_where=sa.text("status IN ('PICKED_UP', 'ACTIVE')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rental_orders_out_end_date', table_name='rental_orders')
+    op.drop_column('rental_orders', 'accrued_late_fee')
+    op.drop_column('rental_orders', 'overdue_days')
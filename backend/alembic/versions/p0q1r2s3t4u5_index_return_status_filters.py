@@ -0,0 +1,43 @@
+"""Partial indexes for the approaching and pending return filters
+
+Revision ID: p0q1r2s3t4u5
+Revises: o9p0q1r2s3t4
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'p0q1r2s3t4u5'
+down_revision: Union[str, None] = 'o9p0q1r2s3t4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OPEN_RETURN = "return_date IS NOT NULL AND status NOT IN ('RETURNED', 'COMPLETED', 'CANCELLED')"
+PENDING_RETURN = "status = 'PICKED_UP'"
+
+# (name, columns, predicate): unscoped for admins, then per vendor and per customer.
+# The approaching list is read in keyset order, so its indexes lead with created_at;
+# the pending count ranges over return_date.
+INDEXES = [
+    ('ix_rental_orders_open_return_created_at_id', ['created_at', 'id'], OPEN_RETURN),
+    ('ix_rental_orders_vendor_open_return_created_at_id', ['vendor_id', 'created_at', 'id'], OPEN_RETURN),
+    ('ix_rental_orders_customer_open_return_created_at_id', ['customer_id', 'created_at', 'id'], OPEN_RETURN),
+    ('ix_rental_orders_pending_return', ['return_date'], PENDING_RETURN),
+    ('ix_rental_orders_vendor_pending_return', ['vendor_id', 'return_date'], PENDING_RETURN),
+    ('ix_rental_orders_customer_pending_return', ['customer_id', 'return_date'], PENDING_RETURN),
+]
+
+
+def upgrade() -> None:
+    for name, columns, predicate in INDEXES:
+        op.create_index(name, 'rental_orders', columns, postgresql_where=sa.text(predicate))
+
+
+def downgrade() -> None:
+    for name, _, _ in INDEXES:
+        op.drop_index(name, table_name='rental_orders')
@@ -0,0 +1,57 @@
+"""Add the append-only order_events log, seeded with each order's current status
+
+Revision ID: q1r2s3t4u5v6
+Revises: p0q1r2s3t4u5
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'q1r2s3t4u5v6'
+down_revision: Union[str, None] = 'p0q1r2s3t4u5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+order_status = postgresql.ENUM(name='orderstatus', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'order_events',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('order_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('customer_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('vendor_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('from_status', order_status, nullable=True),
+        sa.Column('to_status', order_status, nullable=False),
+        sa.Column('actor_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['order_id'], ['rental_orders.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_order_events_order_id_id', 'order_events', ['order_id', 'id'])
+    op.create_index('ix_order_events_customer_id_id', 'order_events', ['customer_id', 'id'])
+    op.create_index('ix_order_events_vendor_id_id', 'order_events', ['vendor_id', 'id'])
+
+    # One baseline event per existing order, so consumers starting at offset 0 see every order
+    op.execute("""
+        INSERT INTO order_events (order_id, customer_id, vendor_id, to_status, source, created_at)
+        SELECT id, customer_id, vendor_id, COALESCE(status, 'PENDING'), 'backfill', COALESCE(updated_at, created_at, now())
+        FROM rental_orders
+        ORDER BY created_at, id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_order_events_vendor_id_id', table_name='order_events')
+    op.drop_index('ix_order_events_customer_id_id', table_name='order_events')
+    op.drop_index('ix_order_events_order_id_id', table_name='order_events')
+    op.drop_table('order_events')
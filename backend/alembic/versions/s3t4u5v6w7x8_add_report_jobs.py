@@ -0,0 +1,65 @@
+"""Add report_jobs for background report exports
+
+Revision ID: s3t4u5v6w7x8
+Revises: r2s3t4u5v6w7
+Create Date: 2026-02-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 's3t4u5v6w7x8'
+down_revision: Union[str, None] = 'r2s3t4u5v6w7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'report_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('report_type', sa.String(), nullable=False),
+        sa.Column('format', sa.String(), nullable=False),
+        sa.Column('compressed', sa.Boolean(), nullable=False),
+        sa.Column('params', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column(
+            'status',
+            sa.Enum('PENDING', 'RUNNING', 'DONE', 'FAILED', 'EXPIRED', name='reportjobstatus'),
+            nullable=False
+        ),
+        sa.Column('cache_hit', sa.Boolean(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('file_name', sa.String(), nullable=True),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_report_jobs_pending', 'report_jobs', ['created_at'],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+    op.create_index(
+        'ix_report_jobs_done_cache_key', 'report_jobs', ['cache_key'],
+        postgresql_where=sa.text("status = 'DONE'")
+    )
+    op.create_index('ix_report_jobs_user_id_created_at', 'report_jobs', ['user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_report_jobs_user_id_created_at', table_name='report_jobs')
+    op.drop_index('ix_report_jobs_done_cache_key', table_name='report_jobs')
+    op.drop_index('ix_report_jobs_pending', table_name='report_jobs')
+    op.drop_table('report_jobs')
+    op.execute("DROP TYPE IF EXISTS reportjobstatus")
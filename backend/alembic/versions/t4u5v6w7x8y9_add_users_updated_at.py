@@ -0,0 +1,26 @@
+"""Add users.updated_at so Last-Modified covers customer and vendor details
+
+Revision ID: t4u5v6w7x8y9
+Revises: s3t4u5v6w7x8
+Create Date: 2026-02-03
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 't4u5v6w7x8y9'
+down_revision: Union[str, None] = 's3t4u5v6w7x8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'updated_at')
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import func, desc
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -7,6 +7,8 @@ from pydantic import BaseModel, EmailStr
 from enum import Enum
 
 from app.db import get_db
+from app.db.loaders import WALLET_TRANSACTION_LOADERS
+from app.api.pagination import apply_keyset, next_cursor_for, set_next_cursor
 from app.db.models.user import User, UserRole
 from app.services.auth_service import get_password_hash, get_current_user
 
@@ -82,6 +84,7 @@ class PaginatedResponse(BaseModel):
     page: int
     per_page: int
     total_pages: int
+    next_cursor: Optional[str] = None
 
 
 # =====================
@@ -132,10 +135,11 @@ async def list_users(
     search: Optional[str] = None,
     role: Optional[UserRole] = None,
     is_active: Optional[bool] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     admin: User = Depends(require_admin)
 ):
-    """List all users with pagination and filters"""
+    """List all users with pagination and filters (pass `next_cursor` back as `cursor` to seek instead of paging)"""
     query = db.query(User)
     
     # Apply filters
@@ -158,7 +162,10 @@ async def list_users(
     total = query.count()
     
     # Apply pagination
-    users = query.order_by(desc(User.created_at)).offset((page - 1) * per_page).limit(per_page).all()
+    paged = apply_keyset(query, User, cursor)
+    if not cursor:
+        paged = paged.offset((page - 1) * per_page)
+    users = paged.limit(per_page).all()
     
     total_pages = (total + per_page - 1) // per_page
     
@@ -178,7 +185,8 @@ async def list_users(
         total=total,
         page=page,
         per_page=per_page,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=next_cursor_for(users, per_page)
     )
 
 
@@ -467,7 +475,8 @@ async def get_all_wallets(
     admin: User = Depends(require_admin)
 ):
     """Get all wallets with user info"""
-    query = db.query(Wallet).join(User, Wallet.user_id == User.id)
+    # Reuse the join for the search filter to load each wallet's user
+    query = db.query(Wallet).join(User, Wallet.user_id == User.id).options(contains_eager(Wallet.user))
     
     if search:
         query = query.filter(
@@ -480,7 +489,7 @@ async def get_all_wallets(
     
     result = []
     for w in wallets:
-        user = db.query(User).filter(User.id == w.user_id).first()
+        user = w.user
         result.append(AdminWalletResponse(
             id=str(w.id),
             user_id=str(w.user_id),
@@ -540,15 +549,17 @@ async def get_wallet_stats(
 
 @router.get("/transactions", response_model=List[AdminTransactionResponse])
 async def get_all_transactions(
+    response: Response,
     search: Optional[str] = None,
     transaction_type: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     admin: User = Depends(require_admin)
 ):
     """Get all transactions across all users"""
-    query = db.query(WalletTransaction).join(Wallet, WalletTransaction.wallet_id == Wallet.id)
+    query = db.query(WalletTransaction).options(*WALLET_TRANSACTION_LOADERS)
     
     if transaction_type:
         if transaction_type.upper() == "CREDIT":
@@ -556,12 +567,17 @@ async def get_all_transactions(
         elif transaction_type.upper() == "DEBIT":
             query = query.filter(WalletTransaction.transaction_type == TransactionType.DEBIT)
     
-    transactions = query.order_by(desc(WalletTransaction.created_at)).offset(skip).limit(limit).all()
+    query = apply_keyset(query, WalletTransaction, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    transactions = query.limit(limit).all()
+    # Cursor follows the scanned rows, so the search filter below can't stall paging
+    set_next_cursor(response, transactions, limit)
     
     result = []
     for txn in transactions:
-        wallet = db.query(Wallet).filter(Wallet.id == txn.wallet_id).first()
-        user = db.query(User).filter(User.id == wallet.user_id).first() if wallet else None
+        wallet = txn.wallet
+        user = wallet.user if wallet else None
         
         # Apply search filter on user info
         if search:
@@ -916,3 +932,67 @@ async def toggle_coupon_status(
     db.commit()
     
     return {"message": f"Coupon {'activated' if coupon.is_active else 'deactivated'}", "is_active": coupon.is_active}
+
+
+# =====================
+# Outbox
+# =====================
+
+from app.db.models.outbox import OutboxMessage, OutboxStatus
+from app.services.outbox_service import retry_message
+
+
+class OutboxMessageResponse(BaseModel):
+    id: str
+    topic: str
+    status: str
+    attempts: int
+    available_at: datetime
+    last_error: Optional[str]
+    created_at: datetime
+    processed_at: Optional[datetime]
+
+
+@router.get("/outbox", response_model=List[OutboxMessageResponse])
+async def list_outbox_messages(
+    status: OutboxStatus = OutboxStatus.DEAD,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Outbox messages by status, newest first (dead letters by default)"""
+    messages = db.query(OutboxMessage).filter(
+        OutboxMessage.status == status
+    ).order_by(OutboxMessage.created_at.desc()).limit(limit).all()
+    return [
+        OutboxMessageResponse(
+            id=str(m.id),
+            topic=m.topic,
+            status=m.status.value,
+            attempts=m.attempts,
+            available_at=m.available_at,
+            last_error=m.last_error,
+            created_at=m.created_at,
+            processed_at=m.processed_at
+        )
+        for m in messages
+    ]
+
+
+@router.post("/outbox/{message_id}/retry")
+async def retry_outbox_message(
+    message_id: str,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Requeue a dead outbox message"""
+    message = db.query(OutboxMessage).filter(OutboxMessage.id == message_id).first()
+    if not message:
+        raise HTTPException(status_code=404, detail="Outbox message not found")
+    if message.status != OutboxStatus.DEAD:
+        raise HTTPException(status_code=400, detail="Only dead messages can be retried")
+
+    retry_message(db, message)
+    db.commit()
+
+    return {"message": "Outbox message requeued"}
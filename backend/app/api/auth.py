@@ -1,9 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Header, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Header, UploadFile
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 import uuid
-import shutil
-from pathlib import Path
 
 from app.db.session import SessionLocal
 from app.api.deps import get_db
@@ -16,6 +14,7 @@ from app.schemas.auth import (
 )
 from app.db.models.user import User
 from app.services import auth_service, email_service
+from app.services.upload_service import IMAGE_UPLOAD_OPENAPI, image_upload, store_image
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -310,46 +309,18 @@ async def update_current_user(
 
 
 # Profile Photo Upload
-UPLOAD_DIR = Path(__file__).parent.parent.parent / "uploads"
-UPLOAD_DIR.mkdir(exist_ok=True)
-ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
-
-
-@router.post("/profile-photo", response_model=UserResponse)
+@router.post("/profile-photo", response_model=UserResponse, openapi_extra=IMAGE_UPLOAD_OPENAPI)
 async def upload_profile_photo(
-    file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(auth_service.get_current_user)
+    current_user: User = Depends(auth_service.get_current_user),
+    file: UploadFile = Depends(image_upload())
 ):
     """Upload profile photo for current user"""
-    # Validate file extension
-    file_ext = Path(file.filename).suffix.lower() if file.filename else ""
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
-    
-    # Generate unique filename
-    unique_filename = f"profile_{current_user.id}_{uuid.uuid4()}{file_ext}"
-    file_path = UPLOAD_DIR / unique_filename
-    
-    # Delete old profile photo if exists
-    if current_user.profile_photo:
-        # Check if it's a local file path (starts with /uploads/)
-        if current_user.profile_photo.startswith("/uploads/"):
-             old_filename = current_user.profile_photo.split("/")[-1]
-             old_path = UPLOAD_DIR / old_filename
-             if old_path.exists():
-                 old_path.unlink()
-    
-    # Save new file
-    try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
-    finally:
-        file.file.close()
+    # Content-addressed files may be shared with other users or products,
+    # so the previous photo is left in place rather than deleted
+    filename = await store_image(file)
 
-    current_user.profile_photo = f"/uploads/{unique_filename}"
+    current_user.profile_photo = f"/uploads/{filename}"
     db.commit()
     db.refresh(current_user)
     
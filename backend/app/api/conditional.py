@@ -0,0 +1,66 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+
+def weak_etag(*parts) -> str:
+    """Weak validator over everything that shows up in a serialized resource"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest[:24]}"'
+
+
+def latest(timestamps: Iterable[Optional[datetime]]) -> Optional[datetime]:
+    values = [t for t in timestamps if t is not None]
+    return max(values) if values else None
+
+
+def _as_utc(value: datetime) -> datetime:
+    # DB timestamps are naive UTC; HTTP dates have second resolution
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore the W/ prefix on both sides
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = "private, no-cache",
+) -> Optional[Response]:
+    """
+    Attach ETag/Last-Modified to `response` and, if the client's cached copy
+    is still current, return a bodyless 304 to send instead of serializing
+    the resource. If-None-Match takes precedence over If-Modified-Since.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    elif last_modified is not None and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            fresh = _as_utc(last_modified) <= _as_utc(since)
+        except (TypeError, ValueError):
+            fresh = False
+    else:
+        fresh = False
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    return None
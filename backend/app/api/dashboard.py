@@ -1,16 +1,24 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from app.db import get_db
+from app.db.session import SessionLocal
 from app.db.models.product import Product
 from app.db.models.order import RentalOrder, OrderStatus
 from app.db.models.invoice import Invoice, InvoiceStatus
 from app.db.models.user import User, UserRole
 from app.services.auth_service import get_current_user
+from app.services.overdue_service import OUT_STATUSES, pending_return_filter
+from app.db.models.report_job import ReportJob, ReportJobStatus
+from app.services.report_service import (
+    EXPORT_FORMATS, ReportError, encode_report, parse_filters, report_rows
+)
+from app.services.report_job_service import artifact_path, download_name, media_type, submit_job
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
@@ -39,6 +47,8 @@ class DashboardStatsResponse(BaseModel):
     total_orders: int
     active_rentals: int
     pending_returns: int
+    overdue_returns: int
+    accrued_late_fees: float
     total_products: int
     top_products: List[TopProduct]
     revenue_by_month: List[RevenueByMonth]
@@ -83,10 +93,13 @@ async def get_dashboard_stats(
     ).count()
     
     # Pending returns (PICKED_UP and return_date <= now)
-    pending_returns = orders_query.filter(
-        RentalOrder.status == OrderStatus.PICKED_UP,
-        RentalOrder.return_date <= datetime.now()
-    ).count()
+    pending_returns = orders_query.filter(pending_return_filter(datetime.now())).count()
+    
+    # Overdue returns and the late fees they have accrued, precomputed by the overdue sweeper
+    overdue_returns, accrued_late_fees = orders_query.filter(
+        RentalOrder.status.in_(OUT_STATUSES),
+        RentalOrder.overdue_days > 0
+    ).with_entities(func.count(RentalOrder.id), func.coalesce(func.sum(RentalOrder.accrued_late_fee), 0)).one()
     
     # Total products
     total_products = products_query.count()
@@ -146,6 +159,8 @@ async def get_dashboard_stats(
         total_orders=total_orders,
         active_rentals=active_rentals,
         pending_returns=pending_returns,
+        overdue_returns=overdue_returns,
+        accrued_late_fees=float(accrued_late_fees),
         total_products=total_products,
         top_products=top_products,
         revenue_by_month=revenue_by_month,
@@ -161,8 +176,9 @@ async def get_recent_orders(
 ):
     """Get recent orders"""
     from app.api.orders import order_to_response
+    from app.db.loaders import ORDER_LOADERS
     
-    query = db.query(RentalOrder)
+    query = db.query(RentalOrder).options(*ORDER_LOADERS)
     
     if current_user.role == UserRole.CUSTOMER:
         query = query.filter(RentalOrder.customer_id == current_user.id)
@@ -358,80 +374,150 @@ async def get_category_distribution(
 async def export_report(
     report_type: str = "orders",
     format: str = "csv",
-    db: Session = Depends(get_db),
+    start_date: Optional[date] = Query(None, description="Only rows created on or after this day"),
+    end_date: Optional[date] = Query(None, description="Only rows created on or before this day"),
+    status: Optional[str] = Query(None, description="Order status (orders report only)"),
     current_user: User = Depends(get_current_user)
 ):
-    """Export report data as CSV"""
-    from fastapi.responses import Response
-    import csv
-    import io
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    if report_type == "orders":
-        # Get orders
-        query = db.query(RentalOrder)
-        if current_user.role == UserRole.VENDOR:
-            query = query.filter(RentalOrder.vendor_id == current_user.id)
-        elif current_user.role == UserRole.CUSTOMER:
-            query = query.filter(RentalOrder.customer_id == current_user.id)
-        
-        orders = query.order_by(RentalOrder.created_at.desc()).limit(500).all()
-        
-        # Write header
-        writer.writerow(["Order Number", "Status", "Total Amount", "Rental Start", "Rental End", "Created At"])
-        
-        for order in orders:
-            writer.writerow([
-                order.order_number,
-                order.status.value if order.status else "",
-                order.total_amount,
-                order.rental_start.isoformat() if order.rental_start else "",
-                order.rental_end.isoformat() if order.rental_end else "",
-                order.created_at.isoformat() if order.created_at else ""
-            ])
-    
-    elif report_type == "products":
-        query = db.query(Product)
-        if current_user.role == UserRole.VENDOR:
-            query = query.filter(Product.vendor_id == current_user.id)
-        
-        products = query.all()
-        
-        writer.writerow(["Name", "Sales Price", "Quantity", "Is Published", "Created At"])
-        
-        for product in products:
-            writer.writerow([
-                product.name,
-                product.sales_price,
-                product.quantity_on_hand,
-                product.is_published,
-                product.created_at.isoformat() if product.created_at else ""
-            ])
-    
-    elif report_type == "revenue":
-        # Revenue by month data
-        writer.writerow(["Month", "Revenue"])
-        
-        current_date = datetime.now()
-        for i in range(11, -1, -1):
-            month_date = current_date - timedelta(days=i * 30)
-            month_revenue = db.query(func.coalesce(func.sum(Invoice.paid_amount), 0)).filter(
-                extract('month', Invoice.created_at) == month_date.month,
-                extract('year', Invoice.created_at) == month_date.year
-            ).scalar() or 0
-            
-            writer.writerow([month_date.strftime("%B %Y"), month_revenue])
-    
-    content = output.getvalue()
-    output.close()
-    
-    filename = f"{report_type}_report.csv"
-    
-    return Response(
-        content=content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    """
+    Export a report as CSV or NDJSON (format=csv|ndjson). Rows are streamed
+    from a server-side cursor, so exports of any size use constant memory.
+    """
+    try:
+        filters = parse_filters(report_type, format, start_date, end_date, status)
+    except ReportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, extension = EXPORT_FORMATS[format]
+
+    def generate():
+        # Its own session: the response body is produced after the endpoint returns
+        db = SessionLocal()
+        try:
+            columns, rows = report_rows(db, report_type, current_user, filters)
+            yield from encode_report(format, columns, rows)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={report_type}_report.{extension}"}
     )
 
+
+
+# =====================
+# Report jobs (generated by report_worker.py)
+# =====================
+
+class ReportJobCreate(BaseModel):
+    report_type: str = "orders"
+    format: str = "csv"
+    compress: bool = False
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    status: Optional[str] = None
+
+
+class ReportJobResponse(BaseModel):
+    id: str
+    report_type: str
+    format: str
+    compressed: bool
+    params: dict
+    status: str
+    cache_hit: bool
+    row_count: Optional[int]
+    size_bytes: Optional[int]
+    error: Optional[str]
+    created_at: datetime
+    finished_at: Optional[datetime]
+    expires_at: Optional[datetime]
+    download_url: Optional[str]
+
+
+def job_to_response(job: ReportJob) -> ReportJobResponse:
+    return ReportJobResponse(
+        id=str(job.id),
+        report_type=job.report_type,
+        format=job.format,
+        compressed=job.compressed,
+        params=job.params,
+        status=job.status.value.lower(),
+        cache_hit=job.cache_hit,
+        row_count=job.row_count,
+        size_bytes=job.size_bytes,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        expires_at=job.expires_at,
+        download_url=f"/api/dashboard/reports/jobs/{job.id}/download" if job.status == ReportJobStatus.DONE else None
+    )
+
+
+def get_job_for_user(db: Session, job_id: str, user: User) -> ReportJob:
+    job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+    if not job or (user.role != UserRole.ADMIN and job.user_id != user.id):
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job
+
+
+@router.post("/reports/jobs", response_model=ReportJobResponse)
+async def create_report_job(
+    job_data: ReportJobCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue a report for report_worker.py to write to a file (optionally
+    gzip-compressed); poll the job, then download it. An identical request
+    over unchanged data is answered from the cached file, already done.
+    """
+    try:
+        filters = parse_filters(
+            job_data.report_type, job_data.format, job_data.start_date, job_data.end_date, job_data.status
+        )
+    except ReportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = submit_job(db, current_user, job_data.report_type, job_data.format, job_data.compress, filters)
+    return job_to_response(job)
+
+
+@router.get("/reports/jobs", response_model=List[ReportJobResponse])
+async def list_report_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """The current user's report jobs, newest first"""
+    jobs = db.query(ReportJob).filter(
+        ReportJob.user_id == current_user.id
+    ).order_by(ReportJob.created_at.desc()).limit(limit).all()
+    return [job_to_response(job) for job in jobs]
+
+
+@router.get("/reports/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return job_to_response(get_job_for_user(db, job_id, current_user))
+
+
+@router.get("/reports/jobs/{job_id}/download")
+async def download_report_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = get_job_for_user(db, job_id, current_user)
+    if job.status == ReportJobStatus.EXPIRED:
+        raise HTTPException(status_code=410, detail="Report file has expired; create the job again")
+    if job.status != ReportJobStatus.DONE:
+        raise HTTPException(status_code=409, detail=f"Report is not ready (status: {job.status.value.lower()})")
+    path = artifact_path(job)
+    if not path.exists():
+        raise HTTPException(status_code=410, detail="Report file is no longer available; create the job again")
+    return FileResponse(path, media_type=media_type(job), filename=download_name(job))
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import itertools
+import uuid
+from datetime import timedelta
+from typing import Any, AsyncIterator, Callable, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.api.deps import get_db as get_auth_db
+from app.core.config import settings
+from app.db import get_db
+from app.db.models.idempotency import IdempotencyKey
+from app.db.models.user import User
+from app.services.auth_service import get_current_user
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+LOCK_NOT_AVAILABLE = "55P03"
+# A duplicate tries the key for CLAIM_LOCK_TIMEOUT, then sleeps CLAIM_RETRY_SECONDS without a connection
+CLAIM_LOCK_TIMEOUT = "100ms"
+CLAIM_RETRY_SECONDS = 0.1
+
+# New keys claimed by this worker; every IDEMPOTENCY_EVICT_EVERY-th also sweeps expired ones
+_claims = itertools.count(1)
+
+
+class KeyInProgress(Exception):
+    """Another request holding the same key has not finished yet"""
+
+
+class IdempotentRequest:
+    """
+    What an endpoint gets from `idempotency(scope)`: either a stored
+    response to send back as-is (`replay`), or a claimed key to `save` the
+    new response under before its commit. Without an Idempotency-Key header
+    both are no-ops.
+    """
+
+    def __init__(self, db: Optional[Session] = None, key_id: Optional[uuid.UUID] = None,
+                 replay: Optional[Response] = None):
+        self.replay = replay
+        self._db = db
+        self._key_id = key_id
+
+    def save(self, result: Any, status_code: int = 200) -> Any:
+        """
+        Write the response into the endpoint's open transaction; returns
+        `result`. Call it before the endpoint's single commit, so the change
+        and its stored response are committed (or lost) together.
+        """
+        if self._db is None or self._key_id is None:
+            return result
+        self._db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == self._key_id)
+            .values(status_code=status_code, response_body=jsonable_encoder(result))
+        )
+        self._key_id = None
+        return result
+
+
+def _fingerprint(request: Request, body: bytes) -> str:
+    return hashlib.sha256(b"\n".join([request.method.encode(), request.url.path.encode(), body])).hexdigest()
+
+
+def _claim(db: Session, user_id: uuid.UUID, key: str, scope: str, fingerprint: str) -> IdempotentRequest:
+    """
+    Insert the key in the endpoint's transaction on `db`, where it stays
+    uncommitted until the endpoint commits its change and saved response.
+    A concurrent request with the same key conflicts with that row: it
+    raises KeyInProgress while the row is in flight, and replays once it is
+    committed. A failed request's row is rolled back with its change, so a
+    waiting duplicate runs instead. An expired key is taken over as if new.
+    """
+    lock_timeout = db.execute(select(func.current_setting("lock_timeout"))).scalar()
+    db.execute(select(func.set_config("lock_timeout", CLAIM_LOCK_TIMEOUT, True)))
+    stmt = insert(IdempotencyKey).values(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        key=key,
+        scope=scope,
+        fingerprint=fingerprint,
+        expires_at=func.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_idempotency_keys_user_id_key",
+        set_={
+            "scope": stmt.excluded.scope,
+            "fingerprint": stmt.excluded.fingerprint,
+            "status_code": None,
+            "response_body": None,
+            "created_at": func.now(),
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=IdempotencyKey.expires_at <= func.now()
+    ).returning(IdempotencyKey.id)
+    try:
+        key_id = db.execute(stmt).scalar()
+    except OperationalError as e:
+        if getattr(e.orig, "pgcode", None) != LOCK_NOT_AVAILABLE:
+            raise
+        db.rollback()
+        raise KeyInProgress()
+    if key_id:
+        # Only the claim waits briefly; the endpoint's own locks use the usual timeout
+        db.execute(select(func.set_config("lock_timeout", lock_timeout, True)))
+        return IdempotentRequest(db, key_id)
+
+    stored = db.query(IdempotencyKey).filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key).one()
+    db.rollback()
+    if stored.scope != scope or stored.fingerprint != fingerprint:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used for a different request")
+    if stored.status_code is None:
+        # Committed without a saved response: the change was made, so never run it again
+        raise HTTPException(status_code=409, detail=f"A request with this {IDEMPOTENCY_HEADER} was already processed")
+    return IdempotentRequest(replay=JSONResponse(
+        content=stored.response_body, status_code=stored.status_code, headers={REPLAYED_HEADER: "true"}
+    ))
+
+
+def evict_expired(db: Session, limit: Optional[int] = None) -> int:
+    """Delete up to `limit` expired keys; SKIP LOCKED leaves keys being taken over alone"""
+    expired = (
+        select(IdempotencyKey.id)
+        .where(IdempotencyKey.expires_at <= func.now())
+        .limit(limit or settings.IDEMPOTENCY_EVICT_BATCH)
+        .with_for_update(skip_locked=True)
+    )
+    deleted = db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.id.in_(expired.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return deleted
+
+
+def _release(db: Session, claimed: bool) -> None:
+    try:
+        # Uncommitted means the request failed: drop the key so a retry runs again
+        db.rollback()
+        if claimed and next(_claims) % settings.IDEMPOTENCY_EVICT_EVERY == 0:
+            evict_expired(db)
+    except Exception as e:
+        print(f"[IDEMPOTENCY] Cleanup failed: {e}")
+
+
+def idempotency(scope: str) -> Callable[..., AsyncIterator[IdempotentRequest]]:
+    """
+    Dependency for a write endpoint that clients may retry. With an
+    Idempotency-Key header, the first request runs and its response is
+    stored per user and key for IDEMPOTENCY_KEY_TTL_SECONDS; repeats get
+    that response back without running the endpoint, and concurrent repeats
+    wait up to IDEMPOTENCY_WAIT_SECONDS for the first to finish (then 409).
+    Only successful responses are stored. The key shares the endpoint's
+    `get_db` session, so the endpoint must `save` before its one commit.
+    """
+    async def dependency(
+        request: Request,
+        db: Session = Depends(get_db),
+        auth_db: Session = Depends(get_auth_db),
+        current_user: User = Depends(get_current_user)
+    ) -> AsyncIterator[IdempotentRequest]:
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            yield IdempotentRequest()
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters")
+
+        fingerprint = _fingerprint(request, await request.body())
+        user_id = current_user.id
+        # End get_current_user's read on its session (the one from app.api.deps),
+        # so a request waiting on the key does not pin that connection too
+        auth_db.rollback()
+        deadline = asyncio.get_running_loop().time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            try:
+                handle = await run_in_threadpool(_claim, db, user_id, key, scope, fingerprint)
+                break
+            except KeyInProgress:
+                pass
+            # Rolled back, so wait for the first request without holding a connection or a thread
+            if asyncio.get_running_loop().time() >= deadline:
+                raise HTTPException(status_code=409, detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress")
+            await asyncio.sleep(CLAIM_RETRY_SECONDS)
+
+        try:
+            yield handle
+        finally:
+            await run_in_threadpool(_release, db, handle.replay is None)
+
+    return dependency
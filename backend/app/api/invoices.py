@@ -1,15 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import uuid
 
 from app.db import get_db
+from app.db.loaders import INVOICE_LOADERS, INVOICE_SUMMARY_COLUMNS
+from app.api.pagination import apply_keyset, check_view, set_next_cursor
+from app.api.conditional import conditional_response, latest, weak_etag
+from app.api.idempotency import IdempotentRequest, idempotency
 from app.db.models.invoice import Invoice, InvoiceLine, InvoiceStatus, Payment, PaymentMethod, PaymentStatus
 from app.db.models.order import RentalOrder, OrderStatus
 from app.db.models.user import User, UserRole
 from app.services.auth_service import get_current_user
+from app.services.numbering_service import next_document_number
+from app.services.outbox_service import enqueue_email
+from app.services.order_state_service import transition
 
 router = APIRouter(prefix="/invoices", tags=["Invoices"])
 
@@ -77,11 +84,23 @@ class InvoiceResponse(BaseModel):
         from_attributes = True
 
 
-def generate_invoice_number():
-    """Generate unique invoice number"""
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    random_suffix = str(uuid.uuid4())[:4].upper()
-    return f"INV-{timestamp}-{random_suffix}"
+class InvoiceSummaryResponse(BaseModel):
+    """Row of GET /invoices?view=summary: no lines and no customer details"""
+    id: str
+    invoice_number: str
+    order_id: str
+    customer_id: str
+    status: str
+    total_amount: float
+    paid_amount: float
+    due_date: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+
+def generate_invoice_number(db: Session) -> str:
+    """Next invoice number from this worker's preallocated block"""
+    return next_document_number(db, "invoice")
 
 
 def invoice_to_response(invoice: Invoice) -> InvoiceResponse:
@@ -121,20 +140,51 @@ def invoice_to_response(invoice: Invoice) -> InvoiceResponse:
     )
 
 
+def invoice_summary_to_response(row) -> InvoiceSummaryResponse:
+    return InvoiceSummaryResponse(
+        id=str(row.id),
+        invoice_number=row.invoice_number or "",
+        order_id=str(row.order_id) if row.order_id else "",
+        customer_id=str(row.customer_id) if row.customer_id else "",
+        status=row.status.value if row.status else "DRAFT",
+        total_amount=row.total_amount or 0,
+        paid_amount=row.paid_amount or 0,
+        due_date=row.due_date.isoformat() if row.due_date else None,
+        created_at=row.created_at.isoformat() if row.created_at else "",
+        updated_at=row.updated_at.isoformat() if row.updated_at else ""
+    )
+
+
+def invoice_etag(invoice: Invoice) -> str:
+    customer = invoice.customer
+    return weak_etag(
+        invoice.id,
+        invoice.updated_at,
+        customer.first_name if customer else None,
+        customer.last_name if customer else None,
+        customer.gstin if customer else None,
+        [(line.id, line.quantity, line.unit_price, line.total_price) for line in invoice.lines],
+    )
+
+
 # =====================
 # Endpoints
 # =====================
 
-@router.get("", response_model=List[InvoiceResponse])
+@router.get("", response_model=Union[List[InvoiceResponse], List[InvoiceSummaryResponse]])
 async def get_invoices(
+        response: Response,
         status: Optional[str] = None,
         skip: int = 0,
         limit: int = 50,
+        cursor: Optional[str] = None,
+        view: str = Query("full", description="full, or summary for slim list rows without lines or names"),
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    """Get invoices"""
-    query = db.query(Invoice)
+    """Get invoices (view=summary selects only the list columns)"""
+    summary = check_view(view)
+    query = db.query(*INVOICE_SUMMARY_COLUMNS) if summary else db.query(Invoice).options(*INVOICE_LOADERS)
 
     # Filter based on user role
     if current_user.role == UserRole.CUSTOMER:
@@ -148,24 +198,36 @@ async def get_invoices(
         except ValueError:
             pass
 
-    invoices = query.order_by(Invoice.created_at.desc()).offset(skip).limit(limit).all()
+    query = apply_keyset(query, Invoice, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    invoices = query.limit(limit).all()
+    set_next_cursor(response, invoices, limit)
+    if summary:
+        return [invoice_summary_to_response(i) for i in invoices]
     return [invoice_to_response(i) for i in invoices]
 
 
 @router.get("/{invoice_id}", response_model=InvoiceResponse)
 async def get_invoice(
         invoice_id: str,
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    """Get a single invoice"""
-    invoice = db.query(Invoice).filter(Invoice.id == uuid.UUID(invoice_id)).first()
+    """Get a single invoice (supports If-None-Match / If-Modified-Since)"""
+    invoice = db.query(Invoice).options(*INVOICE_LOADERS).filter(Invoice.id == uuid.UUID(invoice_id)).first()
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
     if current_user.role == UserRole.CUSTOMER and invoice.customer_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
+    last_modified = latest([invoice.updated_at, invoice.customer.updated_at if invoice.customer else None])
+    not_modified = conditional_response(request, response, invoice_etag(invoice), last_modified)
+    if not_modified:
+        return not_modified
     return invoice_to_response(invoice)
 
 
@@ -176,7 +238,7 @@ async def get_invoice_by_order(
         current_user: User = Depends(get_current_user)
 ):
     """Get invoice for a specific order"""
-    invoice = db.query(Invoice).filter(Invoice.order_id == uuid.UUID(order_id)).first()
+    invoice = db.query(Invoice).options(*INVOICE_LOADERS).filter(Invoice.order_id == uuid.UUID(order_id)).first()
     if not invoice:
         return None
 
@@ -210,7 +272,7 @@ async def create_invoice(
     total_amount = subtotal + tax_amount
 
     invoice = Invoice(
-        invoice_number=generate_invoice_number(),
+        invoice_number=generate_invoice_number(db),
         order_id=order.id,
         customer_id=order.customer_id,
         status=InvoiceStatus.DRAFT,
@@ -246,9 +308,13 @@ async def add_payment(
         invoice_id: str,
         data: PaymentCreate,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user),
+        idempotent: IdempotentRequest = Depends(idempotency("invoices.payment"))
 ):
-    """Add a payment to an invoice"""
+    """Add a payment to an invoice (honours Idempotency-Key)"""
+    if idempotent.replay:
+        return idempotent.replay
+
     invoice = db.query(Invoice).filter(Invoice.id == uuid.UUID(invoice_id)).first()
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
@@ -317,7 +383,6 @@ async def add_payment(
         # Send Payment Receipt Email
         if invoice.customer:
             try:
-                from app.services.email_service import send_email
                 from app.db.models.quotation import Quotation, QuotationStatus
 
                 # Build Line Items Table
@@ -393,17 +458,7 @@ async def add_payment(
                     </body>
                 </html>
                 """
-                try:
-                    print(f"Attempting to send payment confirmation email to {invoice.customer.email}")
-                    send_email(
-                        to_email=invoice.customer.email,
-                        subject=f"Payment Confirmation - {invoice.invoice_number}",
-                        html_content=html_content
-                    )
-                    print(f"Successfully sent payment confirmation email to {invoice.customer.email}")
-                except Exception as e:
-                    print(f"FAILED to send payment confirmation email: {e}")
-                    # Do not re-raise, allow transaction to complete
+                enqueue_email(db, invoice.customer.email, f"Payment Confirmation - {invoice.invoice_number}", html_content)
 
                 if invoice.order_id:
                      # Access order via relationship or query
@@ -432,32 +487,35 @@ async def add_payment(
     elif invoice.paid_amount > 0:
         invoice.status = InvoiceStatus.PARTIAL
 
-    db.commit()
-
     # Update linked order
     if invoice.order_id:
-        order = db.query(RentalOrder).filter(RentalOrder.id == invoice.order_id).first()
+        # Locked (and re-read) so concurrent payments neither lose paid_amount nor confirm twice
+        order = db.query(RentalOrder).filter(
+            RentalOrder.id == invoice.order_id
+        ).populate_existing().with_for_update().first()
         if order:
             order.paid_amount = (order.paid_amount or 0) + data.amount
 
             # If invoice is paid, confirm the order if it was pending
             if invoice.status == InvoiceStatus.PAID and order.status == OrderStatus.PENDING:
-                order.status = OrderStatus.CONFIRMED
+                transition(db, order, OrderStatus.CONFIRMED, "payment", current_user.id, {"invoice_id": str(invoice.id)})
 
             db.add(order)
-            db.commit()
-            db.refresh(order)
 
+    db.flush()
     db.refresh(payment)
 
-    return PaymentResponse(
+    # One commit for the payment, the order and the stored response, so a retry can never pay twice
+    response = idempotent.save(PaymentResponse(
         id=str(payment.id),
         amount=payment.amount,
         method=payment.method.value,
         status=payment.status.value,
         transaction_id=payment.transaction_id,
         created_at=payment.created_at.isoformat() if payment.created_at else ""
-    )
+    ))
+    db.commit()
+    return response
 
 
 @router.get("/{invoice_id}/payments", response_model=List[PaymentResponse])
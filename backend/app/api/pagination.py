@@ -0,0 +1,61 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    """Build an opaque cursor pointing just past (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset(query: Query, model, cursor: Optional[str]) -> Query:
+    """
+    Order newest-first by (created_at, id) and, when a cursor is given,
+    seek past it instead of using OFFSET. Backed by composite
+    (…, created_at, id) indexes so every page costs the same.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+
+def next_cursor_for(rows: Sequence, limit: int) -> Optional[str]:
+    """Cursor for the page after `rows`, or None if this was the last page"""
+    if not rows or len(rows) < limit or rows[-1].created_at is None:
+        return None
+    return encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int) -> Optional[str]:
+    cursor = next_cursor_for(rows, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
+
+
+LIST_VIEWS = ("full", "summary")
+
+
+def check_view(view: str) -> bool:
+    """Validate a list endpoint's ?view= and return True for the slim summary rows"""
+    if view not in LIST_VIEWS:
+        raise HTTPException(status_code=400, detail=f"Unknown view. Use one of: {', '.join(LIST_VIEWS)}")
+    return view == "summary"
@@ -1,19 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, UploadFile, File, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timedelta
+import csv
 import uuid
 import os
-import shutil
-from pathlib import Path
 
+from app.core.config import settings
 from app.db import get_db
+from app.db.session import SessionLocal
+from app.db.loaders import PRODUCT_LOADERS
+from app.api.pagination import apply_keyset, set_next_cursor
+from app.api.conditional import conditional_response, latest, weak_etag
 from app.db.models.product import Product, Category
 from app.db.models.user import User
 from app.services.auth_service import get_current_user
+from app.services.search_service import apply_product_search, apply_attribute_filters, parse_attribute_filters
+from app.services.cache_service import TTLCache
+from app.services.upload_service import IMAGE_UPLOAD_OPENAPI, image_upload, store_image
+from app.services.image_service import product_image_variants, refresh_product_variants, schedule_variants
+from app.services.facet_service import facet_index, FacetFilters, PRICE_BUCKETS, PRICE_PERIODS
+from app.services.pricing_service import PriceRequest, PricingError, order_totals, price_lines
+from app.services.product_import_service import detect_format, export_products, import_products, IMPORT_FORMATS
+from app.services.availability_service import (
+    Availability, get_availability, get_availability_batch, get_availability_calendar, invalidate_product_availability
+)
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -78,6 +92,7 @@ class ProductResponse(BaseModel):
     name: str
     description: Optional[str] = None
     images: List[str] = []
+    image_variants: List[Dict[str, str]] = []  # Per-image {thumb, card, full} URLs, same order as images
     category: Optional[str] = None
     category_id: Optional[str] = None
     is_rentable: bool
@@ -103,6 +118,96 @@ class CategoryCreate(BaseModel):
     description: Optional[str] = None
 
 
+class ProductAvailabilityResponse(BaseModel):
+    product_id: str
+    start: str
+    end: str
+    quantity_on_hand: int
+    reserved: int  # Peak units booked at any moment of the window
+    available: int
+
+
+class AvailabilitySlot(BaseModel):
+    start: str
+    reserved: int
+    available: int
+
+
+class ProductAvailabilityCalendar(BaseModel):
+    product_id: str
+    granularity: str
+    quantity_on_hand: int
+    slots: List[AvailabilitySlot]
+
+
+class QuoteLineRequest(BaseModel):
+    product_id: str
+    start_date: str
+    end_date: str
+    quantity: int = 1
+
+
+class QuoteRequest(BaseModel):
+    lines: List[QuoteLineRequest]
+    security_deposit: float = 0
+
+
+class QuoteLineResponse(BaseModel):
+    product_id: str
+    product_name: str
+    vendor_id: Optional[str] = None
+    start_date: str
+    end_date: str
+    quantity: int
+    billed_hours: int
+    weeks: int
+    days: int
+    hours: int
+    unit_price: float
+    total_price: float
+
+
+class QuoteResponse(BaseModel):
+    lines: List[QuoteLineResponse]
+    subtotal: float
+    tax_rate: float
+    tax_amount: float
+    security_deposit: float
+    total_amount: float
+
+
+class ProductImportError(BaseModel):
+    row: int
+    error: str
+
+
+class ProductImportResponse(BaseModel):
+    created: int
+    failed: int
+    categories_created: int
+    errors: List[ProductImportError] = []
+
+
+class FacetBucket(BaseModel):
+    value: str
+    label: str
+    count: int
+
+
+class ProductFacets(BaseModel):
+    category: List[FacetBucket] = []
+    price: List[FacetBucket] = []
+    is_rentable: List[FacetBucket] = []
+    availability: List[FacetBucket] = []
+    attributes: Dict[str, List[FacetBucket]] = {}
+
+
+class FacetedProductsResponse(BaseModel):
+    items: List[ProductResponse]
+    total: int
+    facets: ProductFacets
+
+
 def product_to_response(product: Product) -> ProductResponse:
     vendor_name = ""
     if product.vendor:
@@ -117,6 +222,7 @@ def product_to_response(product: Product) -> ProductResponse:
         name=product.name,
         description=product.description,
         images=product.images or [],
+        image_variants=product_image_variants(product.images or [], product.image_variants),
         category=category_name,
         category_id=str(product.category_id) if product.category_id else None,
         is_rentable=product.is_rentable,
@@ -139,22 +245,26 @@ def product_to_response(product: Product) -> ProductResponse:
     )
 
 
+def product_etag(product: Product) -> str:
+    vendor = product.vendor
+    category = product.category_rel
+    return weak_etag(
+        product.id,
+        product.updated_at,
+        category.name if category else None,
+        category.updated_at if category else None,
+        f"{vendor.first_name} {vendor.last_name}" if vendor else None,
+    )
+
+
 # =====================
 # Image Upload Endpoint
 # =====================
 
-# Configure upload directory
-UPLOAD_DIR = Path(__file__).parent.parent.parent / "uploads"
-UPLOAD_DIR.mkdir(exist_ok=True)
-
-ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-
-
-@router.post("/upload-image")
+@router.post("/upload-image", openapi_extra=IMAGE_UPLOAD_OPENAPI)
 async def upload_product_image(
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    file: UploadFile = Depends(image_upload())
 ):
     """Upload a product image (vendors and admins only)"""
     from app.db.models.user import UserRole
@@ -162,56 +272,53 @@ async def upload_product_image(
     if current_user.role not in [UserRole.VENDOR, UserRole.ADMIN]:
         raise HTTPException(status_code=403, detail="Only vendors and admins can upload images")
     
-    # Validate file extension
-    file_ext = Path(file.filename).suffix.lower() if file.filename else ""
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
-    
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = UPLOAD_DIR / unique_filename
-    
-    # Save file
-    try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
-    finally:
-        file.file.close()
+    # Stored under its content hash, so identical images share one file
+    filename = await store_image(file)
+    # Start resizing now so variants are usually ready by the time the product is saved
+    schedule_variants(filename)
     
     # Return URL path (will be served via static files)
-    image_url = f"/uploads/{unique_filename}"
-    
-    return {"url": image_url, "filename": unique_filename}
+    return {"url": f"/uploads/{filename}", "filename": filename}
 
 
 # =====================
 # Category Endpoints
 # =====================
-@router.get("/categories", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
-    """Get all categories with product counts"""
+
+# Category list with counts; cleared by every product/category write below
+category_cache = TTLCache(ttl_seconds=settings.CATEGORY_CACHE_TTL_SECONDS)
+CATEGORY_LIST_KEY = "active_categories"
+
+
+def invalidate_catalog_cache():
+    category_cache.invalidate()
+
+
+def load_categories(db: Session) -> List[CategoryResponse]:
+    """Active categories with product counts in a single grouped query"""
     from sqlalchemy import func
     
-    # Get categories with product count
-    categories = db.query(Category).filter(Category.is_active == True).all()
+    rows = db.query(Category, func.count(Product.id)).outerjoin(
+        Product, Product.category_id == Category.id
+    ).filter(Category.is_active == True).group_by(Category.id).order_by(Category.name).all()
     
-    result = []
-    for c in categories:
-        product_count = db.query(func.count(Product.id)).filter(Product.category_id == c.id).scalar() or 0
-        result.append(CategoryResponse(
+    return [
+        CategoryResponse(
             id=str(c.id),
             name=c.name,
             description=c.description,
             is_active=c.is_active,
-            product_count=product_count,
-            created_at=c.created_at.isoformat() if hasattr(c, 'created_at') and c.created_at else None
-        ))
-    return result
+            product_count=product_count or 0,
+            created_at=c.created_at.isoformat() if c.created_at else None
+        )
+        for c, product_count in rows
+    ]
+
+
+@router.get("/categories", response_model=List[CategoryResponse])
+async def get_categories(db: Session = Depends(get_db)):
+    """Get all categories with product counts"""
+    return category_cache.get_or_set(CATEGORY_LIST_KEY, lambda: load_categories(db))
 
 
 @router.post("/categories", response_model=CategoryResponse)
@@ -233,6 +340,7 @@ async def create_category(
     db.add(category)
     db.commit()
     db.refresh(category)
+    invalidate_catalog_cache()
     
     return CategoryResponse(
         id=str(category.id),
@@ -250,25 +358,31 @@ async def create_category(
 
 @router.get("", response_model=List[ProductResponse])
 async def get_products(
+    response: Response,
     search: Optional[str] = None,
     category: Optional[str] = None,
     is_published: Optional[bool] = None,
     vendor_id: Optional[str] = None,
+    attribute: List[str] = Query([], description="Attribute filters as name:value, repeatable"),
     sort_by: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get all products with optional filters"""
-    query = db.query(Product)
+    """
+    Get all products with optional filters.
+    With the default (newest first) order the next page cursor is returned in
+    the X-Next-Cursor header; pass it back as `cursor` instead of `skip`.
+    """
+    if cursor and sort_by not in (None, '', 'relevance'):
+        raise HTTPException(status_code=400, detail="Cursor pagination only supports the default sort order")
     
+    query = db.query(Product).options(*PRODUCT_LOADERS)
+    
+    search_rank = None
     if search:
-        query = query.filter(
-            or_(
-                Product.name.ilike(f"%{search}%"),
-                Product.description.ilike(f"%{search}%")
-            )
-        )
+        query, search_rank = apply_product_search(db, query, search)
     
     if category:
         cat = db.query(Category).filter(Category.name == category).first()
@@ -281,7 +395,14 @@ async def get_products(
     if vendor_id:
         query = query.filter(Product.vendor_id == uuid.UUID(vendor_id))
     
+    if attribute:
+        try:
+            query = apply_attribute_filters(query, parse_attribute_filters(attribute))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     # Sorting
+    keyset_order = False
     if sort_by == 'price_asc':
         # Default to daily rental price for sorting
         query = query.order_by(Product.rental_price_daily.asc())
@@ -291,26 +412,358 @@ async def get_products(
         query = query.order_by((Product.quantity_on_hand - Product.reserved_quantity).asc())
     elif sort_by == 'quantity_desc':
         query = query.order_by((Product.quantity_on_hand - Product.reserved_quantity).desc())
+    elif search_rank is not None and sort_by in (None, '', 'relevance') and not cursor:
+        # Best matches first when searching without an explicit sort
+        query = query.order_by(search_rank.desc(), Product.created_at.desc())
     else:
-        # Default sort by creation
-        query = query.order_by(Product.created_at.desc())
+        # Default sort by creation, which is also the keyset order
+        query = apply_keyset(query, Product, cursor)
+        keyset_order = True
     
-    products = query.offset(skip).limit(limit).all()
+    if not cursor:
+        query = query.offset(skip)
+    products = query.limit(limit).all()
+    if keyset_order:
+        set_next_cursor(response, products, limit)
     return [product_to_response(p) for p in products]
 
 
+def price_bucket_label(index: int) -> str:
+    low, high = PRICE_BUCKETS[index]
+    return f"{low:g}+" if high is None else f"{low:g}-{high:g}"
+
+
+@router.get("/faceted", response_model=FacetedProductsResponse)
+async def get_products_faceted(
+    search: Optional[str] = None,
+    category: List[str] = Query([]),
+    price_period: str = "daily",
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    is_rentable: Optional[bool] = None,
+    min_available: Optional[int] = None,
+    attribute: List[str] = Query([], description="Attribute filters as name:value, repeatable"),
+    is_published: Optional[bool] = None,
+    vendor_id: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+    db: Session = Depends(get_db)
+):
+    """
+    Filter products on category, rental price range, rentability, available
+    quantity and attributes, returning facet counts alongside the page.
+    Values of one facet are OR'ed, different facets are AND'ed; each facet's
+    counts ignore that facet's own filter. Served from an in-process index
+    that this worker's product, checkout, release and import writes update
+    on commit; writes made by other workers show up within
+    FACET_INDEX_TTL_SECONDS.
+    """
+    if price_period not in PRICE_PERIODS:
+        raise HTTPException(status_code=400, detail=f"price_period must be one of: {', '.join(PRICE_PERIODS)}")
+    
+    try:
+        attribute_filters = parse_attribute_filters(attribute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    product_ids = None
+    if search:
+        ids_query, _ = apply_product_search(db, db.query(Product.id), search)
+        product_ids = {row[0] for row in ids_query}
+    
+    result = facet_index.search(db, FacetFilters(
+        categories=set(category) or None,
+        price_period=price_period,
+        min_price=min_price,
+        max_price=max_price,
+        is_rentable=is_rentable,
+        min_available=min_available,
+        attributes=attribute_filters,
+        is_published=is_published,
+        vendor_id=uuid.UUID(vendor_id) if vendor_id else None,
+        product_ids=product_ids,
+    ), sort_by=sort_by)
+    
+    page_ids = result.ids[skip:skip + limit]
+    products = db.query(Product).options(*PRODUCT_LOADERS).filter(Product.id.in_(page_ids)).all() if page_ids else []
+    by_id = {p.id: p for p in products}
+    
+    facets = ProductFacets(
+        category=[
+            FacetBucket(value=name, label=name, count=count)
+            for name, count in sorted(result.categories.items(), key=lambda kv: (-kv[1], kv[0]))
+        ],
+        price=[
+            FacetBucket(value=str(index), label=price_bucket_label(index), count=result.price[index])
+            for index in sorted(result.price)
+        ],
+        is_rentable=[
+            FacetBucket(value=str(value).lower(), label="Rentable" if value else "Not rentable", count=count)
+            for value, count in sorted(result.is_rentable.items(), reverse=True)
+        ],
+        availability=[
+            FacetBucket(value=key, label="In stock" if key == "in_stock" else "Out of stock", count=result.availability[key])
+            for key in ("in_stock", "out_of_stock") if key in result.availability
+        ],
+        attributes={
+            name: [
+                FacetBucket(value=value, label=value, count=count)
+                for value, count in sorted(values.items(), key=lambda kv: (-kv[1], kv[0]))
+            ]
+            for name, values in sorted(result.attributes.items())
+        },
+    )
+    
+    return FacetedProductsResponse(
+        items=[product_to_response(by_id[i]) for i in page_ids if i in by_id],
+        total=result.total,
+        facets=facets
+    )
+
+
+MAX_AVAILABILITY_BATCH = 200
+
+
+def availability_to_response(availability: Availability, start: datetime, end: datetime) -> ProductAvailabilityResponse:
+    return ProductAvailabilityResponse(
+        product_id=str(availability.product_id),
+        start=start.isoformat(),
+        end=end.isoformat(),
+        quantity_on_hand=availability.quantity_on_hand,
+        reserved=availability.peak_reserved,
+        available=availability.available
+    )
+
+
+def validate_window(start: datetime, end: datetime):
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+
+@router.get("/availability", response_model=List[ProductAvailabilityResponse])
+async def get_products_availability(
+    start: datetime,
+    end: datetime,
+    product_id: List[str] = Query(..., description="Repeat for each product on the page"),
+    db: Session = Depends(get_db)
+):
+    """Units free during [start, end) for a batch of products"""
+    validate_window(start, end)
+    if len(product_id) > MAX_AVAILABILITY_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_AVAILABILITY_BATCH} products per request")
+    try:
+        ids = [uuid.UUID(pid) for pid in product_id]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid product id")
+    
+    results = get_availability_batch(db, ids, start, end)
+    return [availability_to_response(results[pid], start, end) for pid in dict.fromkeys(ids) if pid in results]
+
+
+MAX_QUOTE_LINES = 1000
+
+
+@router.post("/quote", response_model=QuoteResponse)
+async def quote_rental(data: QuoteRequest, db: Session = Depends(get_db)):
+    """Price a cart: cheapest mix of weekly, daily and hourly rates per line"""
+    if len(data.lines) > MAX_QUOTE_LINES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_QUOTE_LINES} lines per quote")
+    try:
+        requests = [
+            PriceRequest(
+                product_id=uuid.UUID(line.product_id),
+                start=datetime.fromisoformat(line.start_date.replace('Z', '+00:00')),
+                end=datetime.fromisoformat(line.end_date.replace('Z', '+00:00')),
+                quantity=line.quantity
+            )
+            for line in data.lines
+        ]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid product id or rental dates")
+    
+    try:
+        quotes = price_lines(db, requests)
+    except PricingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    totals = order_totals(sum(quote.total_price for quote in quotes), data.security_deposit)
+    return QuoteResponse(
+        lines=[
+            QuoteLineResponse(
+                product_id=str(quote.product_id),
+                product_name=quote.product_name,
+                vendor_id=str(quote.vendor_id) if quote.vendor_id else None,
+                start_date=quote.start.isoformat(),
+                end_date=quote.end.isoformat(),
+                quantity=quote.quantity,
+                billed_hours=quote.billed_hours,
+                weeks=quote.weeks,
+                days=quote.days,
+                hours=quote.hours,
+                unit_price=quote.unit_price,
+                total_price=quote.total_price
+            )
+            for quote in quotes
+        ],
+        security_deposit=data.security_deposit,
+        **totals
+    )
+
+
+@router.post("/import", response_model=ProductImportResponse)
+async def import_products_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or ndjson; inferred from the file extension if omitted"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Bulk-create products from a CSV or NDJSON file (vendors and admins only)"""
+    from app.db.models.user import UserRole
+    if current_user.role not in [UserRole.VENDOR, UserRole.ADMIN]:
+        raise HTTPException(status_code=403, detail="Only vendors can import products")
+    
+    fmt = detect_format(file.filename, format)
+    if not fmt:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format. Use one of: {', '.join(IMPORT_FORMATS)}")
+    
+    try:
+        report = await run_in_threadpool(import_products, db, file.file, fmt, current_user.id)
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Import file must be UTF-8 encoded")
+    except csv.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Malformed CSV: {str(e)}")
+    finally:
+        await file.close()
+    
+    # Batches already committed stay imported even if a later one fails above;
+    # import_products hands each committed batch to the facet index itself
+    invalidate_catalog_cache()
+    
+    return ProductImportResponse(
+        created=report.created,
+        failed=report.failed,
+        categories_created=report.categories_created,
+        errors=[ProductImportError(**e) for e in report.errors]
+    )
+
+
+@router.get("/export")
+async def export_products_file(
+    format: str = Query("csv", description="csv or ndjson"),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream the caller's products (all products for admins) as CSV or NDJSON"""
+    from app.db.models.user import UserRole
+    if current_user.role not in [UserRole.VENDOR, UserRole.ADMIN]:
+        raise HTTPException(status_code=403, detail="Only vendors and admins can export products")
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format. Use one of: {', '.join(IMPORT_FORMATS)}")
+    
+    vendor_id = None if current_user.role == UserRole.ADMIN else current_user.id
+    
+    def rows():
+        # The request session is closed before the body streams, so use a dedicated one
+        export_db = SessionLocal()
+        try:
+            yield from export_products(export_db, format, vendor_id)
+        finally:
+            export_db.close()
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"products-{datetime.utcnow():%Y%m%d%H%M%S}.{format}"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: str, db: Session = Depends(get_db)):
-    """Get a single product by ID"""
-    product = db.query(Product).filter(Product.id == uuid.UUID(product_id)).first()
+async def get_product(product_id: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    """Get a single product by ID (supports If-None-Match / If-Modified-Since)"""
+    product = db.query(Product).options(*PRODUCT_LOADERS).filter(Product.id == uuid.UUID(product_id)).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    
+    last_modified = latest([
+        product.updated_at,
+        product.category_rel.updated_at if product.category_rel else None,
+        product.vendor.updated_at if product.vendor else None,
+    ])
+    not_modified = conditional_response(request, response, product_etag(product), last_modified, cache_control="public, no-cache")
+    if not_modified:
+        return not_modified
     return product_to_response(product)
 
 
+@router.get("/{product_id}/availability", response_model=ProductAvailabilityResponse)
+async def get_product_availability(
+    product_id: str,
+    start: datetime,
+    end: datetime,
+    db: Session = Depends(get_db)
+):
+    """Units of a product free during [start, end)"""
+    validate_window(start, end)
+    availability = get_availability(db, uuid.UUID(product_id), start, end)
+    if not availability:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return availability_to_response(availability, start, end)
+
+
+# granularity -> (slot length, default slots, max slots)
+CALENDAR_GRANULARITIES = {
+    "day": (timedelta(days=1), 90, 366),
+    "hour": (timedelta(hours=1), 72, 24 * 31),
+}
+
+
+@router.get("/{product_id}/availability-calendar", response_model=ProductAvailabilityCalendar)
+async def get_product_availability_calendar(
+    product_id: str,
+    start: Optional[datetime] = Query(None, description="Defaults to the start of today (UTC)"),
+    granularity: str = Query("day", description="day or hour"),
+    slots: Optional[int] = Query(None, ge=1, description="Number of days/hours; 90 days or 72 hours by default"),
+    db: Session = Depends(get_db)
+):
+    """Free units per day (or hour) for an availability heatmap"""
+    if granularity not in CALENDAR_GRANULARITIES:
+        raise HTTPException(status_code=400, detail="granularity must be day or hour")
+    step, default_slots, max_slots = CALENDAR_GRANULARITIES[granularity]
+    slots = slots or default_slots
+    if slots > max_slots:
+        raise HTTPException(status_code=400, detail=f"At most {max_slots} {granularity} slots per request")
+    
+    if start is None:
+        start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    # Align to the slot boundary so cache keys repeat across requests
+    start = start.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        start = start.replace(hour=0)
+    
+    calendar = get_availability_calendar(db, uuid.UUID(product_id), start, step, slots)
+    if calendar is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    quantity_on_hand, peaks = calendar
+    
+    return ProductAvailabilityCalendar(
+        product_id=product_id,
+        granularity=granularity,
+        quantity_on_hand=quantity_on_hand,
+        slots=[
+            AvailabilitySlot(start=slot_start.isoformat(), reserved=peak, available=max(0, quantity_on_hand - peak))
+            for slot_start, peak in peaks
+        ]
+    )
+
+
 @router.post("", response_model=ProductResponse)
 async def create_product(
     data: ProductCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -338,6 +791,10 @@ async def create_product(
     db.add(product)
     db.commit()
     db.refresh(product)
+    invalidate_catalog_cache()
+    facet_index.upsert(product)
+    if product.images:
+        background_tasks.add_task(refresh_product_variants, product.id)
     
     return product_to_response(product)
 
@@ -346,6 +803,7 @@ async def create_product(
 async def update_product(
     product_id: str,
     data: ProductUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -387,6 +845,11 @@ async def update_product(
     
     db.commit()
     db.refresh(product)
+    invalidate_catalog_cache()
+    facet_index.upsert(product)
+    invalidate_product_availability([product.id])
+    if data.images is not None:
+        background_tasks.add_task(refresh_product_variants, product.id)
     
     return product_to_response(product)
 
@@ -407,7 +870,11 @@ async def delete_product(
     if current_user.role != UserRole.ADMIN and product.vendor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this product")
     
+    deleted_id = product.id
     db.delete(product)
     db.commit()
+    invalidate_catalog_cache()
+    facet_index.remove(deleted_id)
+    invalidate_product_availability([deleted_id])
     
     return {"message": "Product deleted successfully"}
@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import uuid
 
 from app.db import get_db
+from app.db.loaders import QUOTATION_LOADERS, QUOTATION_SUMMARY_COLUMNS
+from app.api.pagination import apply_keyset, check_view, set_next_cursor
+from app.api.conditional import conditional_response, latest, weak_etag
 from app.db.models.quotation import Quotation, QuotationLine, QuotationStatus
 from app.db.models.product import Product
 from app.db.models.user import User, UserRole
 from app.services.auth_service import get_current_user
+from app.services.pricing_service import PriceRequest, PricingError, order_totals, price_lines
+from app.services.numbering_service import next_document_number
+from app.services.outbox_service import enqueue_email
 
 router = APIRouter(prefix="/quotations", tags=["Quotations"])
 
@@ -29,8 +35,9 @@ class QuotationLineCreate(BaseModel):
     product_id: str
     quantity: int = 1
     rental_period: RentalPeriodSelection
-    unit_price: float
-    total_price: float
+    # Accepted for older clients but ignored: lines are priced server-side
+    unit_price: Optional[float] = None
+    total_price: Optional[float] = None
 
 
 class QuotationCreate(BaseModel):
@@ -82,11 +89,22 @@ class QuotationResponse(BaseModel):
         from_attributes = True
 
 
-def generate_quotation_number():
-    """Generate unique quotation number"""
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    random_suffix = str(uuid.uuid4())[:4].upper()
-    return f"QUO-{timestamp}-{random_suffix}"
+class QuotationSummaryResponse(BaseModel):
+    """Row of GET /quotations?view=summary: no lines and no customer name"""
+    id: str
+    quotation_number: str
+    customer_id: str
+    vendor_id: str
+    status: str
+    total_amount: float
+    valid_until: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+
+def generate_quotation_number(db: Session) -> str:
+    """Next quotation number from this worker's preallocated block"""
+    return next_document_number(db, "quotation")
 
 
 def quotation_to_response(quotation: Quotation) -> QuotationResponse:
@@ -125,20 +143,49 @@ def quotation_to_response(quotation: Quotation) -> QuotationResponse:
     )
 
 
+def quotation_summary_to_response(row) -> QuotationSummaryResponse:
+    return QuotationSummaryResponse(
+        id=str(row.id),
+        quotation_number=row.quotation_number or "",
+        customer_id=str(row.customer_id) if row.customer_id else "",
+        vendor_id=str(row.vendor_id) if row.vendor_id else "",
+        status=row.status.value if row.status else "DRAFT",
+        total_amount=row.total_amount or 0,
+        valid_until=row.valid_until.isoformat() if row.valid_until else None,
+        created_at=row.created_at.isoformat() if row.created_at else "",
+        updated_at=row.updated_at.isoformat() if row.updated_at else ""
+    )
+
+
+def quotation_etag(quotation: Quotation) -> str:
+    customer = quotation.customer
+    return weak_etag(
+        quotation.id,
+        quotation.updated_at,
+        customer.first_name if customer else None,
+        customer.last_name if customer else None,
+        [(line.id, line.quantity, line.unit_price, line.total_price) for line in quotation.lines],
+    )
+
+
 # =====================
 # Endpoints
 # =====================
 
-@router.get("", response_model=List[QuotationResponse])
+@router.get("", response_model=Union[List[QuotationResponse], List[QuotationSummaryResponse]])
 async def get_quotations(
+    response: Response,
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    view: str = Query("full", description="full, or summary for slim list rows without lines or names"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get quotations - filtered by user"""
-    query = db.query(Quotation)
+    """Get quotations - filtered by user (view=summary selects only the list columns)"""
+    summary = check_view(view)
+    query = db.query(*QUOTATION_SUMMARY_COLUMNS) if summary else db.query(Quotation).options(*QUOTATION_LOADERS)
     
     # Filter based on user role
     if current_user.role == UserRole.CUSTOMER:
@@ -154,18 +201,26 @@ async def get_quotations(
         except ValueError:
             pass
     
-    quotations = query.order_by(Quotation.created_at.desc()).offset(skip).limit(limit).all()
+    query = apply_keyset(query, Quotation, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    quotations = query.limit(limit).all()
+    set_next_cursor(response, quotations, limit)
+    if summary:
+        return [quotation_summary_to_response(q) for q in quotations]
     return [quotation_to_response(q) for q in quotations]
 
 
 @router.get("/{quotation_id}", response_model=QuotationResponse)
 async def get_quotation(
     quotation_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get a single quotation"""
-    quotation = db.query(Quotation).filter(Quotation.id == uuid.UUID(quotation_id)).first()
+    """Get a single quotation (supports If-None-Match / If-Modified-Since)"""
+    quotation = db.query(Quotation).options(*QUOTATION_LOADERS).filter(Quotation.id == uuid.UUID(quotation_id)).first()
     if not quotation:
         raise HTTPException(status_code=404, detail="Quotation not found")
     
@@ -174,6 +229,10 @@ async def get_quotation(
     if current_user.role == UserRole.VENDOR and quotation.vendor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    last_modified = latest([quotation.updated_at, quotation.customer.updated_at if quotation.customer else None])
+    not_modified = conditional_response(request, response, quotation_etag(quotation), last_modified)
+    if not_modified:
+        return not_modified
     return quotation_to_response(quotation)
 
 
@@ -183,23 +242,36 @@ async def create_quotation(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Create new quotation(s) - splits by vendor"""
+    """Create new quotation(s) - splits by vendor, priced server-side"""
+    try:
+        requests = [
+            PriceRequest(
+                product_id=uuid.UUID(line_data.product_id),
+                start=datetime.fromisoformat(line_data.rental_period.start_date.replace('Z', '+00:00')),
+                end=datetime.fromisoformat(line_data.rental_period.end_date.replace('Z', '+00:00')),
+                quantity=line_data.quantity
+            )
+            for line_data in data.lines
+        ]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid product id or rental dates")
+    
+    try:
+        quotes = price_lines(db, requests)
+    except PricingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     # 1. Group items by vendor
     items_by_vendor = {}
     
-    for line_data in data.lines:
-        product = db.query(Product).filter(Product.id == uuid.UUID(line_data.product_id)).first()
-        if not product:
-            continue
-            
-        vendor_id = str(product.vendor_id)
+    for line_data, quote in zip(data.lines, quotes):
+        vendor_id = str(quote.vendor_id)
         if vendor_id not in items_by_vendor:
             items_by_vendor[vendor_id] = []
         
-        # Attach product info to line data for later use
         items_by_vendor[vendor_id].append({
             "line_data": line_data,
-            "product": product
+            "quote": quote
         })
     
     created_quotations = []
@@ -207,20 +279,17 @@ async def create_quotation(
     # 2. Create one quotation per vendor
     for vendor_id, items in items_by_vendor.items():
         # Calculate totals for this vendor's items
-        subtotal = sum(item["line_data"].total_price for item in items)
-        tax_rate = 18
-        tax_amount = subtotal * (tax_rate / 100)
-        total_amount = subtotal + tax_amount
+        totals = order_totals(sum(item["quote"].total_price for item in items))
         
         quotation = Quotation(
-            quotation_number=generate_quotation_number(),
+            quotation_number=generate_quotation_number(db),
             customer_id=current_user.id,
             vendor_id=uuid.UUID(vendor_id),
             status=QuotationStatus.DRAFT,
-            subtotal=subtotal,
-            tax_rate=tax_rate,
-            tax_amount=tax_amount,
-            total_amount=total_amount,
+            subtotal=totals["subtotal"],
+            tax_rate=totals["tax_rate"],
+            tax_amount=totals["tax_amount"],
+            total_amount=totals["total_amount"],
             valid_until=datetime.now() + timedelta(days=data.valid_days),
             notes=data.notes
         )
@@ -230,18 +299,18 @@ async def create_quotation(
         # Create lines
         for item in items:
             line_data = item["line_data"]
-            product = item["product"]
+            quote = item["quote"]
             
             line = QuotationLine(
                 quotation_id=quotation.id,
-                product_id=product.id,
-                product_name=product.name,
-                quantity=line_data.quantity,
+                product_id=quote.product_id,
+                product_name=quote.product_name,
+                quantity=quote.quantity,
                 rental_period_type=line_data.rental_period.type,
-                rental_start_date=datetime.fromisoformat(line_data.rental_period.start_date.replace('Z', '+00:00')),
-                rental_end_date=datetime.fromisoformat(line_data.rental_period.end_date.replace('Z', '+00:00')),
-                unit_price=line_data.unit_price,
-                total_price=line_data.total_price
+                rental_start_date=quote.start,
+                rental_end_date=quote.end,
+                unit_price=quote.unit_price,
+                total_price=quote.total_price
             )
             db.add(line)
         
@@ -276,27 +345,22 @@ async def update_quotation(
             
             # Send email to customer if status is SENT
             if new_status == QuotationStatus.SENT and quotation.customer:
-                try:
-                    from app.services.email_service import send_email
-                    
-                    subject = f"New Quotation Received - {quotation.quotation_number}"
-                    html_content = f"""
-                    <html>
-                        <body>
-                            <div style="font-family: Arial, sans-serif; padding: 20px;">
-                                <h2>You have received a new quotation!</h2>
-                                <p>Hi {quotation.customer.first_name},</p>
-                                <p>Vendor has submitted a quotation for your request.</p>
-                                <p><strong>Quotation Number:</strong> {quotation.quotation_number}</p>
-                                <p><strong>Amount:</strong> ₹{quotation.total_amount}</p>
-                                <p>Please login to your dashboard to review and accept/reject this quotation.</p>
-                            </div>
-                        </body>
-                    </html>
-                    """
-                    send_email(quotation.customer.email, subject, html_content)
-                except Exception as e:
-                    print(f"Failed to send quotation email: {e}")
+                subject = f"New Quotation Received - {quotation.quotation_number}"
+                html_content = f"""
+                <html>
+                    <body>
+                        <div style="font-family: Arial, sans-serif; padding: 20px;">
+                            <h2>You have received a new quotation!</h2>
+                            <p>Hi {quotation.customer.first_name},</p>
+                            <p>Vendor has submitted a quotation for your request.</p>
+                            <p><strong>Quotation Number:</strong> {quotation.quotation_number}</p>
+                            <p><strong>Amount:</strong> ₹{quotation.total_amount}</p>
+                            <p>Please login to your dashboard to review and accept/reject this quotation.</p>
+                        </div>
+                    </body>
+                </html>
+                """
+                enqueue_email(db, quotation.customer.email, subject, html_content)
 
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid status")
@@ -0,0 +1,87 @@
+import mimetypes
+import os
+import re
+from typing import Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.config import settings
+
+# Names that can never point at different bytes: SHA-256 uploads and their
+# variants (see upload_service/image_service) plus legacy UUID filenames
+IMMUTABLE_NAME = re.compile(
+    r"^(?:[0-9a-f]{64}(?:-[a-z]+)?"
+    r"|(?:profile_[0-9a-f-]{36}_)?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})"
+    r"\.[a-z0-9]+$"
+)
+
+# Precompressed siblings, in order of preference
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(request_headers: Headers) -> set:
+    accepted = set()
+    for part in request_headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class UploadStaticFiles(StaticFiles):
+    """
+    StaticFiles for /uploads. Content-addressed names get a long-lived
+    immutable Cache-Control so browsers and CDNs stop revalidating them,
+    and a `.br`/`.gz` file next to the original is served in its place
+    when the client accepts that encoding. Range requests and
+    If-None-Match/If-Modified-Since are handled by Starlette.
+    """
+
+    def precompressed(self, full_path: str, request_headers: Headers) -> Tuple[Optional[str], str, Optional[os.stat_result], bool]:
+        """(encoding, path, stat) of the best sibling, and whether any sibling exists"""
+        accepted = accepted_encodings(request_headers)
+        has_sibling = False
+        for encoding, suffix in PRECOMPRESSED:
+            try:
+                stat_result = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            has_sibling = True
+            if encoding in accepted:
+                return encoding, full_path + suffix, stat_result, True
+        return None, full_path, None, has_sibling
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        name = os.path.basename(full_path)
+
+        encoding, path, encoded_stat, has_sibling = self.precompressed(full_path, request_headers)
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            stat_result=encoded_stat or stat_result,
+            media_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        )
+        if encoding:
+            response.headers["content-encoding"] = encoding
+        if has_sibling:
+            response.headers["vary"] = "Accept-Encoding"
+
+        if IMMUTABLE_NAME.match(name):
+            response.headers["cache-control"] = f"public, max-age={settings.UPLOAD_CACHE_MAX_AGE_SECONDS}, immutable"
+        else:
+            response.headers["cache-control"] = "public, no-cache"
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
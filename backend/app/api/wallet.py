@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
@@ -7,6 +7,8 @@ from datetime import datetime
 import uuid
 
 from app.db import get_db
+from app.api.pagination import apply_keyset, set_next_cursor
+from app.api.idempotency import IdempotentRequest, idempotency
 from app.db.models.wallet import Wallet, WalletTransaction, TransactionType, TransactionStatus
 from app.db.models.user import User
 from app.services.auth_service import get_current_user
@@ -163,9 +165,11 @@ async def get_wallet_summary(
 
 @router.get("/transactions", response_model=List[TransactionResponse])
 async def get_transactions(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
     transaction_type: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -181,7 +185,11 @@ async def get_transactions(
         except ValueError:
             pass
     
-    transactions = query.order_by(WalletTransaction.created_at.desc()).offset(skip).limit(limit).all()
+    query = apply_keyset(query, WalletTransaction, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    transactions = query.limit(limit).all()
+    set_next_cursor(response, transactions, limit)
     return [transaction_to_response(t) for t in transactions]
 
 
@@ -189,13 +197,22 @@ async def get_transactions(
 async def add_funds(
     data: AddFundsRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotent: IdempotentRequest = Depends(idempotency("wallet.add_funds"))
 ):
-    """Add funds to wallet"""
+    """Add funds to wallet (honours Idempotency-Key)"""
+    if idempotent.replay:
+        return idempotent.replay
+    
     if data.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be greater than 0")
     
-    wallet = get_or_create_wallet(db, current_user.id)
+    # Created without committing, so the top-up below stays a single transaction
+    wallet = db.query(Wallet).filter(Wallet.user_id == current_user.id).first()
+    if not wallet:
+        wallet = Wallet(user_id=current_user.id, balance=0.0)
+        db.add(wallet)
+        db.flush()
     
     if not wallet.is_active:
         raise HTTPException(status_code=400, detail="Wallet is inactive")
@@ -217,10 +234,13 @@ async def add_funds(
     )
     
     db.add(transaction)
-    db.commit()
+    db.flush()
     db.refresh(transaction)
     
-    return transaction_to_response(transaction)
+    # Stored in the same commit as the top-up, so a retry can never credit twice
+    response = idempotent.save(transaction_to_response(transaction))
+    db.commit()
+    return response
 
 
 @router.post("/withdraw", response_model=TransactionResponse)
@@ -34,6 +34,40 @@ class Settings(BaseSettings):
     RAZORPAY_KEY_ID: Optional[str] = None
     RAZORPAY_KEY_SECRET: Optional[str] = None
     
+    # Catalog caching
+    CATEGORY_CACHE_TTL_SECONDS: int = 300
+    FACET_INDEX_TTL_SECONDS: int = 60
+    AVAILABILITY_CALENDAR_TTL_SECONDS: int = 15  # other workers' bookings show up after this
+    
+    # Uploads
+    MAX_UPLOAD_SIZE_BYTES: int = 5 * 1024 * 1024
+    IMAGE_VARIANT_WORKERS: int = 2  # 0 disables thumbnail generation
+    UPLOAD_CACHE_MAX_AGE_SECONDS: int = 365 * 24 * 60 * 60
+
+    # Outbox worker (python outbox_worker.py)
+    OUTBOX_BATCH_SIZE: int = 20
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 2
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_BACKOFF_BASE_SECONDS: int = 30
+    OUTBOX_BACKOFF_MAX_SECONDS: int = 6 * 60 * 60
+    OUTBOX_LEASE_SECONDS: int = 300
+
+    # Overdue sweeper (python overdue_sweeper.py)
+    OVERDUE_SWEEP_INTERVAL_SECONDS: int = 15 * 60
+
+    # Idempotency-Key replays (app/api/idempotency.py)
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_WAIT_SECONDS: float = 10  # how long a duplicate waits for the first request before a 409
+    IDEMPOTENCY_EVICT_EVERY: int = 100  # new keys per worker between expired-key sweeps
+    IDEMPOTENCY_EVICT_BATCH: int = 1000
+
+    # Report jobs (python report_worker.py)
+    REPORT_DIR: str = "reports"  # relative to the backend directory unless absolute
+    REPORT_POLL_INTERVAL_SECONDS: float = 2
+    REPORT_JOB_LEASE_SECONDS: int = 30 * 60
+    REPORT_JOB_MAX_ATTEMPTS: int = 3
+    REPORT_ARTIFACT_TTL_SECONDS: int = 24 * 60 * 60
+    
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 settings = Settings()
@@ -0,0 +1,67 @@
+"""
+Eager-loading profiles for the API serializers.
+
+Each *_to_response helper walks a few relationships; applying the matching
+profile to the query loads that whole graph up front, so a page of N rows
+costs a fixed handful of SELECTs instead of one per row per relationship.
+
+The *_SUMMARY_COLUMNS sets are the other way round: list endpoints called
+with view=summary select just these columns, with no relationships at all.
+"""
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.db.models.product import Product
+from app.db.models.order import RentalOrder
+from app.db.models.invoice import Invoice
+from app.db.models.quotation import Quotation
+from app.db.models.wallet import Wallet, WalletTransaction
+
+
+# product_to_response: vendor name + category name
+PRODUCT_LOADERS = (
+    joinedload(Product.vendor),
+    joinedload(Product.category_rel),
+)
+
+# order_to_response: customer/vendor names + lines
+ORDER_LOADERS = (
+    joinedload(RentalOrder.customer),
+    joinedload(RentalOrder.vendor),
+    selectinload(RentalOrder.lines),
+)
+
+# invoice_to_response: customer name/GSTIN + lines
+INVOICE_LOADERS = (
+    joinedload(Invoice.customer),
+    selectinload(Invoice.lines),
+)
+
+# quotation_to_response: customer name + lines
+QUOTATION_LOADERS = (
+    joinedload(Quotation.customer),
+    selectinload(Quotation.lines),
+)
+
+# Admin transaction listing: owning wallet and its user
+WALLET_TRANSACTION_LOADERS = (
+    joinedload(WalletTransaction.wallet).joinedload(Wallet.user),
+)
+
+
+# view=summary list rows: number, parties, status, totals and dates
+ORDER_SUMMARY_COLUMNS = (
+    RentalOrder.id, RentalOrder.order_number, RentalOrder.customer_id, RentalOrder.vendor_id,
+    RentalOrder.status, RentalOrder.total_amount, RentalOrder.paid_amount,
+    RentalOrder.rental_start_date, RentalOrder.rental_end_date, RentalOrder.overdue_days,
+    RentalOrder.created_at, RentalOrder.updated_at,
+)
+
+INVOICE_SUMMARY_COLUMNS = (
+    Invoice.id, Invoice.invoice_number, Invoice.order_id, Invoice.customer_id, Invoice.status,
+    Invoice.total_amount, Invoice.paid_amount, Invoice.due_date, Invoice.created_at, Invoice.updated_at,
+)
+
+QUOTATION_SUMMARY_COLUMNS = (
+    Quotation.id, Quotation.quotation_number, Quotation.customer_id, Quotation.vendor_id, Quotation.status,
+    Quotation.total_amount, Quotation.valid_until, Quotation.created_at, Quotation.updated_at,
+)
@@ -1,8 +1,11 @@
 from .user import User
 from .product import Product
 from .quotation import Quotation
-from .order import RentalOrder
+from .order import RentalOrder, OrderEvent
 from .reservation import Reservation
 from .invoice import Invoice
 from .wallet import Wallet, WalletTransaction
 from .coupon import Coupon, DiscountType
+from .outbox import OutboxMessage
+from .idempotency import IdempotencyKey
+from .report_job import ReportJob
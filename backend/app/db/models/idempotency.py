@@ -0,0 +1,26 @@
+import uuid
+from sqlalchemy import Column, DateTime, Integer, String, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """Stored response of a write request made with an Idempotency-Key header (see app/api/idempotency.py)"""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    key = Column(String(255), nullable=False)
+    scope = Column(String, nullable=False)
+    # sha256 of the method, path and body the key was first used with
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    response_body = Column(JSONB)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
@@ -1,6 +1,6 @@
 import uuid
 import enum
-from sqlalchemy import Column, Enum, Float, ForeignKey, DateTime, String, Integer, Text
+from sqlalchemy import Column, Enum, Float, ForeignKey, DateTime, String, Integer, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -71,6 +71,12 @@ class Invoice(Base):
     lines = relationship("InvoiceLine", back_populates="invoice", cascade="all, delete-orphan")
     payments = relationship("Payment", back_populates="invoice")
 
+    __table_args__ = (
+        # Keyset pagination (see app/api/pagination.py)
+        Index("ix_invoices_created_at_id", "created_at", "id"),
+        Index("ix_invoices_customer_created_at_id", "customer_id", "created_at", "id"),
+    )
+
 
 class Payment(Base):
     __tablename__ = "payments"
@@ -1,7 +1,7 @@
 import uuid
 import enum
-from sqlalchemy import Column, Enum, ForeignKey, DateTime, Float, String, Integer, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import BigInteger, Column, Enum, ForeignKey, DateTime, Float, Identity, String, Integer, Text, Index, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -17,6 +17,10 @@ class OrderStatus(str, enum.Enum):
     CANCELLED = "CANCELLED"
 
 
+# Orders with a return date that are not yet closed
+OPEN_RETURN_PREDICATE = "return_date IS NOT NULL AND status NOT IN ('RETURNED', 'COMPLETED', 'CANCELLED')"
+
+
 class OrderLine(Base):
     __tablename__ = "order_lines"
 
@@ -57,6 +61,9 @@ class RentalOrder(Base):
     pickup_date = Column(DateTime, nullable=True)
     return_date = Column(DateTime, nullable=True)
     late_return_fee = Column(Float, default=0)
+    # Precomputed by overdue_service.sweep_overdue while the order is out past rental_end_date
+    overdue_days = Column(Integer, default=0, nullable=False)
+    accrued_late_fee = Column(Float, default=0, nullable=False)
     
     notes = Column(Text)
     
@@ -69,3 +76,57 @@ class RentalOrder(Base):
     quotation = relationship("Quotation")
     lines = relationship("OrderLine", back_populates="order", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination (see app/api/pagination.py)
+        Index("ix_rental_orders_created_at_id", "created_at", "id"),
+        Index("ix_rental_orders_customer_created_at_id", "customer_id", "created_at", "id"),
+        Index("ix_rental_orders_vendor_created_at_id", "vendor_id", "created_at", "id"),
+        # "approaching" returns list (overdue_service.approaching_return_filter): keyset order over open
+        # orders with a return date, unscoped for admins and scoped by vendor and customer
+        Index("ix_rental_orders_open_return_created_at_id", "created_at", "id", postgresql_where=text(OPEN_RETURN_PREDICATE)),
+        Index(
+            "ix_rental_orders_vendor_open_return_created_at_id", "vendor_id", "created_at", "id",
+            postgresql_where=text(OPEN_RETURN_PREDICATE)
+        ),
+        Index(
+            "ix_rental_orders_customer_open_return_created_at_id", "customer_id", "created_at", "id",
+            postgresql_where=text(OPEN_RETURN_PREDICATE)
+        ),
+        # pending_returns count (overdue_service.pending_return_filter)
+        Index("ix_rental_orders_pending_return", "return_date", postgresql_where=text("status = 'PICKED_UP'")),
+        Index("ix_rental_orders_vendor_pending_return", "vendor_id", "return_date", postgresql_where=text("status = 'PICKED_UP'")),
+        Index("ix_rental_orders_customer_pending_return", "customer_id", "return_date", postgresql_where=text("status = 'PICKED_UP'")),
+        # Overdue sweep: orders still out, by due date
+        Index(
+            "ix_rental_orders_out_end_date", "rental_end_date",
+            postgresql_where=text("status IN ('PICKED_UP', 'ACTIVE')")
+        ),
+    )
+
+
+class OrderEvent(Base):
+    """
+    Append-only log of order status transitions (see order_state_service).
+    The id is the consumers' offset: events are appended under a lock held
+    to commit, so ids become visible in order and none is skipped.
+    """
+    __tablename__ = "order_events"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    order_id = Column(UUID(as_uuid=True), ForeignKey("rental_orders.id", ondelete="CASCADE"), nullable=False)
+    # Copied from the order so scoped feeds need no join
+    customer_id = Column(UUID(as_uuid=True))
+    vendor_id = Column(UUID(as_uuid=True))
+    from_status = Column(Enum(OrderStatus), nullable=True)
+    to_status = Column(Enum(OrderStatus), nullable=False)
+    # Who made the change; no foreign key, so the history outlives deleted users
+    actor_id = Column(UUID(as_uuid=True), nullable=True)
+    source = Column(String, nullable=False)
+    data = Column(JSONB)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_order_events_order_id_id", "order_id", "id"),
+        Index("ix_order_events_customer_id_id", "customer_id", "id"),
+        Index("ix_order_events_vendor_id_id", "vendor_id", "id"),
+    )
@@ -0,0 +1,32 @@
+import uuid
+import enum
+from sqlalchemy import Column, Enum, DateTime, Integer, String, Text, Index, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    DONE = "DONE"
+    DEAD = "DEAD"
+
+
+class OutboxMessage(Base):
+    """A side effect (email, wallet credit) recorded in the same transaction as the change that caused it"""
+    __tablename__ = "outbox_messages"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    topic = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    available_at = Column(DateTime, server_default=func.now(), nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    processed_at = Column(DateTime)
+
+    __table_args__ = (
+        # The worker's claim query: due messages, oldest first
+        Index("ix_outbox_messages_due", "available_at", postgresql_where=text("status = 'PENDING'")),
+    )
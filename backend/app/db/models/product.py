@@ -1,11 +1,18 @@
 import uuid
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, Float, DateTime, Text, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, Float, DateTime, Text, JSON, Computed, Index
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR, JSONB
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from app.db.base import Base
 
 
+# Weighted search document: name matches rank above description matches
+PRODUCT_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -28,6 +35,7 @@ class Product(Base):
     name = Column(String, nullable=False)
     description = Column(Text)
     images = Column(JSON, default=list)  # List of image URLs
+    image_variants = Column(JSON, default=dict)  # {image URL: {size: variant URL}}, see image_service
     
     is_rentable = Column(Boolean, default=True)
     rental_price_hourly = Column(Float, nullable=True)
@@ -42,7 +50,10 @@ class Product(Base):
     
     is_published = Column(Boolean, default=False)
     
-    attributes = Column(JSON, default=list)  # List of {name, value} dicts
+    attributes = Column(JSONB, default=list)  # List of {name, value} dicts, GIN-indexed for @> filters
+    
+    # Maintained by Postgres as a stored generated column, never written by the app
+    search_vector = deferred(Column(TSVECTOR, Computed(PRODUCT_SEARCH_DOCUMENT, persisted=True)))
     
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -51,6 +62,14 @@ class Product(Base):
     vendor = relationship("User", foreign_keys=[vendor_id])
     category_rel = relationship("Category", back_populates="products")
 
+    __table_args__ = (
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_products_attributes", "attributes", postgresql_using="gin", postgresql_ops={"attributes": "jsonb_path_ops"}),
+        # Keyset pagination (see app/api/pagination.py)
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_vendor_created_at_id", "vendor_id", "created_at", "id"),
+    )
+
     @property
     def available_quantity(self):
         return self.quantity_on_hand - self.reserved_quantity
@@ -1,6 +1,6 @@
 import uuid
 import enum
-from sqlalchemy import Column, Enum, ForeignKey, Float, DateTime, String, Integer, JSON, Text
+from sqlalchemy import Column, Enum, ForeignKey, Float, DateTime, String, Integer, JSON, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -61,3 +61,10 @@ class Quotation(Base):
     customer = relationship("User", foreign_keys=[customer_id])
     lines = relationship("QuotationLine", back_populates="quotation", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination (see app/api/pagination.py)
+        Index("ix_quotations_created_at_id", "created_at", "id"),
+        Index("ix_quotations_customer_created_at_id", "customer_id", "created_at", "id"),
+        Index("ix_quotations_vendor_created_at_id", "vendor_id", "created_at", "id"),
+    )
+
@@ -0,0 +1,47 @@
+import uuid
+import enum
+from sqlalchemy import Boolean, Column, Enum, DateTime, Integer, BigInteger, String, Text, Index, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class ReportJobStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    EXPIRED = "EXPIRED"  # artifact deleted after REPORT_ARTIFACT_TTL_SECONDS
+
+
+class ReportJob(Base):
+    """A report export generated by report_worker.py into a file under REPORT_DIR"""
+    __tablename__ = "report_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    report_type = Column(String, nullable=False)
+    format = Column(String, nullable=False)
+    compressed = Column(Boolean, default=False, nullable=False)
+    params = Column(JSONB, nullable=False)  # start_date, end_date, status
+    # sha256 over scope, parameters and data version; equal keys produce the same file
+    cache_key = Column(String(64), nullable=False)
+    status = Column(Enum(ReportJobStatus), default=ReportJobStatus.PENDING, nullable=False)
+    cache_hit = Column(Boolean, default=False, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    file_name = Column(String)
+    size_bytes = Column(BigInteger)
+    row_count = Column(Integer)
+    error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    expires_at = Column(DateTime)
+
+    __table_args__ = (
+        # The worker's claim query: queued jobs, oldest first
+        Index("ix_report_jobs_pending", "created_at", postgresql_where=text("status = 'PENDING'")),
+        # Cache lookups for a finished artifact
+        Index("ix_report_jobs_done_cache_key", "cache_key", postgresql_where=text("status = 'DONE'")),
+        Index("ix_report_jobs_user_id_created_at", "user_id", "created_at"),
+    )
@@ -1,5 +1,5 @@
 import uuid, enum
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Enum
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Enum, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.base import Base
 
@@ -17,3 +17,12 @@ class Reservation(Base):
     reserved_to = Column(DateTime)
     quantity = Column(Integer)
     status = Column(Enum(ReservationStatus), default=ReservationStatus.ACTIVE)
+
+    __table_args__ = (
+        # Interval lookups in availability_service: product, then reservations still running after t1
+        Index(
+            "ix_reservations_active_window", "product_id", "reserved_to", "reserved_from",
+            postgresql_where=text("status = 'ACTIVE'")
+        ),
+        Index("ix_reservations_order_id", "order_id"),
+    )
@@ -5,6 +5,7 @@ from sqlalchemy import (
     Enum,
     DateTime,
     ForeignKey,
+    Index,
     func,
 )
 from sqlalchemy.dialects.postgresql import UUID
@@ -63,6 +64,8 @@ class User(Base):
     profile_photo = Column(String, nullable=True)  # URL to profile photo
     google_refresh_token = Column(String, nullable=True) # Google Calendar Refresh Token
     created_at = Column(DateTime, server_default=func.now())
+    # Feeds Last-Modified of the orders, invoices, quotations and products showing this user's details
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Referral system
     referral_code = Column(String(8), unique=True, index=True, nullable=True)
@@ -72,3 +75,8 @@ class User(Base):
     # Relationships
     wallet = relationship("Wallet", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
     referrer = relationship("User", remote_side=[id], foreign_keys=[referred_by])
+
+    __table_args__ = (
+        # Keyset pagination (see app/api/pagination.py)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
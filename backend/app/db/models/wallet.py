@@ -1,6 +1,6 @@
 import uuid
 import enum
-from sqlalchemy import Column, Enum, ForeignKey, DateTime, Float, String, Text, Boolean
+from sqlalchemy import Column, Enum, ForeignKey, DateTime, Float, String, Text, Boolean, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -58,3 +58,9 @@ class WalletTransaction(Base):
 
     # Relationships
     wallet = relationship("Wallet", back_populates="transactions")
+
+    __table_args__ = (
+        # Keyset pagination (see app/api/pagination.py)
+        Index("ix_wallet_transactions_created_at_id", "created_at", "id"),
+        Index("ix_wallet_transactions_wallet_created_at_id", "wallet_id", "created_at", "id"),
+    )
@@ -1,6 +1,5 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from app.api.auth import router as auth_router
 from app.api.admin import router as admin_router
@@ -12,6 +11,9 @@ from app.api.dashboard import router as dashboard_router
 from app.api.wallet import router as wallet_router
 from app.api.calendar import router as calendar_router
 from app.api.payment import router as payment_router
+from app.api.static_uploads import UploadStaticFiles
+from app.services.facet_service import facet_index
+from app.services.image_service import shutdown_executor
 
 app = FastAPI(
     title="Odoo x GCET - Rental Management",
@@ -25,12 +27,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
 )
 
-# Mount static files for uploaded images
+# Mount static files for uploaded images (immutable caching, Range, precompressed siblings)
 UPLOAD_DIR = Path(__file__).parent.parent / "uploads"
 UPLOAD_DIR.mkdir(exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+app.mount("/uploads", UploadStaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+
+# Stop the thumbnail worker processes with the server
+app.add_event_handler("shutdown", shutdown_executor)
+
+# Build the facet index off the request path and rebuild it every FACET_INDEX_TTL_SECONDS
+app.add_event_handler("startup", facet_index.start)
+app.add_event_handler("shutdown", facet_index.stop)
 
 # Include routers
 app.include_router(auth_router)
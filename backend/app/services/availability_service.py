@@ -0,0 +1,320 @@
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, event, func, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+from app.db.models.order import OrderLine
+from app.db.models.product import Product
+from app.db.models.reservation import Reservation, ReservationStatus
+from app.services.cache_service import TTLCache
+from app.services.facet_service import mark_products_changed
+
+# Calendars keyed by (product_id, start, end, step); dropped once a transaction
+# changing that product's reservations or stock commits in this worker. Other
+# workers only see the change when the entry expires, hence the short TTL.
+calendar_cache = TTLCache(ttl_seconds=settings.AVAILABILITY_CALENDAR_TTL_SECONDS, max_entries=2048)
+# Products whose reservations or stock changed in a session, invalidated once it commits
+CHANGED_AVAILABILITY_KEY = "availability_changed_products"
+# Bumped by every invalidation, so a calendar computed across one is not cached
+_invalidations = 0
+
+
+class AvailabilityError(ValueError):
+    """Not enough free units for a requested window; message is safe to show"""
+
+
+@dataclass
+class Availability:
+    product_id: uuid.UUID
+    quantity_on_hand: int
+    peak_reserved: int
+
+    @property
+    def available(self) -> int:
+        return max(0, self.quantity_on_hand - self.peak_reserved)
+
+
+def naive(value: datetime) -> datetime:
+    """Match how reservation timestamps are stored (timestamp without time zone)"""
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def peak_overlap(intervals: Iterable[Tuple[datetime, datetime, int]], start: datetime, end: datetime) -> int:
+    """
+    Highest number of units held at any instant of [start, end), by a
+    sweep over interval endpoints. Intervals are half-open, so a booking
+    ending exactly when another starts does not count twice.
+    """
+    events = []
+    for reserved_from, reserved_to, quantity in intervals:
+        events.append((max(reserved_from, start), quantity))
+        events.append((min(reserved_to, end), -quantity))
+    # Releases sort before acquisitions at the same instant
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def overlapping_reservations(db: Session, product_ids: List[uuid.UUID], start: datetime, end: datetime):
+    """Active reservations touching [start, end), served by ix_reservations_active_window"""
+    return db.query(
+        Reservation.product_id, Reservation.reserved_from, Reservation.reserved_to, Reservation.quantity
+    ).filter(
+        Reservation.product_id.in_(product_ids),
+        Reservation.status == ReservationStatus.ACTIVE,
+        Reservation.reserved_to > start,
+        Reservation.reserved_from < end
+    ).all()
+
+
+def slot_peaks(
+    intervals: Iterable[Tuple[datetime, datetime, int]],
+    start: datetime,
+    step: timedelta,
+    slots: int
+) -> List[int]:
+    """
+    Peak units held within each of `slots` consecutive [start + i*step,
+    start + (i+1)*step) windows, in one sweep over the sorted interval
+    endpoints rather than one overlap query per slot.
+    """
+    end = start + step * slots
+    events = []
+    for reserved_from, reserved_to, quantity in intervals:
+        if reserved_to <= start or reserved_from >= end:
+            continue
+        events.append((max(reserved_from, start), quantity))
+        events.append((min(reserved_to, end), -quantity))
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    peaks = []
+    current = 0
+    i = 0
+    for slot in range(slots):
+        slot_end = start + step * (slot + 1)
+        # Units still held when the slot opens (releases at the boundary already applied)
+        while i < len(events) and events[i][0] <= start + step * slot and events[i][1] < 0:
+            current += events[i][1]
+            i += 1
+        peak = current
+        while i < len(events) and events[i][0] < slot_end:
+            current += events[i][1]
+            peak = max(peak, current)
+            i += 1
+        peaks.append(peak)
+    return peaks
+
+
+def get_availability_calendar(
+    db: Session,
+    product_id: uuid.UUID,
+    start: datetime,
+    step: timedelta,
+    slots: int
+) -> Optional[Tuple[int, List[Tuple[datetime, int]]]]:
+    """
+    (quantity_on_hand, [(slot start, peak reserved)]) for consecutive slots,
+    loading the product's overlapping reservations once. Cached per product
+    until a transaction that reserves or releases its units commits.
+    """
+    start = naive(start)
+    key = (product_id, start, step, slots)
+    cached = calendar_cache.get(key)
+    if cached is not None:
+        return cached
+    generation = _invalidations
+
+    product = db.query(Product.quantity_on_hand).filter(Product.id == product_id).first()
+    if not product:
+        return None
+    end = start + step * slots
+    intervals = [
+        (reserved_from, reserved_to, quantity or 0)
+        for _, reserved_from, reserved_to, quantity in overlapping_reservations(db, [product_id], start, end)
+    ]
+    peaks = slot_peaks(intervals, start, step, slots)
+    result = (product.quantity_on_hand or 0, [(start + step * i, peak) for i, peak in enumerate(peaks)])
+    if generation == _invalidations:
+        calendar_cache.set(key, result)
+    return result
+
+
+def invalidate_product_availability(product_ids: Iterable[uuid.UUID]) -> None:
+    """Drop cached calendars now; call after the change has committed"""
+    global _invalidations
+    product_ids = set(product_ids)
+    if product_ids:
+        _invalidations += 1
+        calendar_cache.invalidate_matching(lambda key: key[0] in product_ids)
+
+
+def mark_availability_changed(db: Session, product_ids: Iterable[uuid.UUID]) -> None:
+    """Drop these products' cached calendars once `db` commits (nothing on rollback)"""
+    db.info.setdefault(CHANGED_AVAILABILITY_KEY, set()).update(product_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_availability(session: Session) -> None:
+    changed = session.info.pop(CHANGED_AVAILABILITY_KEY, None)
+    if changed:
+        invalidate_product_availability(changed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_changed_availability(session: Session, previous_transaction) -> None:
+    session.info.pop(CHANGED_AVAILABILITY_KEY, None)
+
+
+def get_availability_batch(
+    db: Session,
+    product_ids: Iterable[uuid.UUID],
+    start: datetime,
+    end: datetime
+) -> Dict[uuid.UUID, Availability]:
+    """Availability over [start, end) for many products in two queries"""
+    product_ids = list(dict.fromkeys(product_ids))
+    if not product_ids:
+        return {}
+    start, end = naive(start), naive(end)
+
+    stock = dict(db.query(Product.id, Product.quantity_on_hand).filter(Product.id.in_(product_ids)).all())
+    intervals = defaultdict(list)
+    for product_id, reserved_from, reserved_to, quantity in overlapping_reservations(db, list(stock), start, end):
+        intervals[product_id].append((reserved_from, reserved_to, quantity or 0))
+
+    return {
+        product_id: Availability(
+            product_id=product_id,
+            quantity_on_hand=quantity_on_hand or 0,
+            peak_reserved=peak_overlap(intervals[product_id], start, end)
+        )
+        for product_id, quantity_on_hand in stock.items()
+    }
+
+
+def get_availability(db: Session, product_id: uuid.UUID, start: datetime, end: datetime) -> Optional[Availability]:
+    return get_availability_batch(db, [product_id], start, end).get(product_id)
+
+
+def lock_products(db: Session, product_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, Product]:
+    """
+    Load and row-lock products with SELECT ... FOR UPDATE in primary-key
+    order, so concurrent checkouts touching the same products queue up
+    behind each other instead of deadlocking or overselling.
+    """
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return {}
+    products = db.query(Product).filter(Product.id.in_(product_ids)).order_by(Product.id).with_for_update().all()
+    return {product.id: product for product in products}
+
+
+def check_availability(db: Session, products: Dict[uuid.UUID, Product], requests) -> None:
+    """
+    Raise AvailabilityError if any request (objects with product_id,
+    start, end and quantity) would push its product past quantity_on_hand
+    at some instant, counting both existing reservations and the other
+    requests in the same batch. Call with the products locked.
+    """
+    requests = list(requests)
+    if not requests:
+        return
+    window_start = min(naive(r.start) for r in requests)
+    window_end = max(naive(r.end) for r in requests)
+
+    intervals = defaultdict(list)
+    for product_id, reserved_from, reserved_to, quantity in overlapping_reservations(
+        db, list(products), window_start, window_end
+    ):
+        intervals[product_id].append((reserved_from, reserved_to, quantity or 0))
+    existing = {product_id: list(held) for product_id, held in intervals.items()}
+    for r in requests:
+        intervals[r.product_id].append((naive(r.start), naive(r.end), r.quantity))
+
+    for r in requests:
+        product = products[r.product_id]
+        on_hand = product.quantity_on_hand or 0
+        start, end = naive(r.start), naive(r.end)
+        if peak_overlap(intervals[r.product_id], start, end) > on_hand:
+            free = max(0, on_hand - peak_overlap(existing.get(r.product_id, []), start, end))
+            raise AvailabilityError(
+                f"Only {free} unit(s) of {product.name} available from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}"
+            )
+
+
+def reserve_lines(db: Session, order_id: uuid.UUID, lines: Iterable[OrderLine]) -> List[Reservation]:
+    """Record an ACTIVE reservation for every dated order line (caller commits)"""
+    reservations = [
+        Reservation(
+            product_id=line.product_id,
+            order_id=order_id,
+            reserved_from=naive(line.rental_start_date),
+            reserved_to=naive(line.rental_end_date),
+            quantity=line.quantity,
+            status=ReservationStatus.ACTIVE
+        )
+        for line in lines
+        if line.product_id and line.rental_start_date and line.rental_end_date
+    ]
+    db.add_all(reservations)
+    mark_availability_changed(db, (r.product_id for r in reservations))
+    return reservations
+
+
+def release_orders(db: Session, order_ids: Iterable[uuid.UUID]) -> int:
+    """Free every unit the orders still hold, in one UPDATE (caller commits)"""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return 0
+    released = db.execute(
+        update(Reservation)
+        .where(Reservation.order_id.in_(order_ids), Reservation.status == ReservationStatus.ACTIVE)
+        .values(status=ReservationStatus.RELEASED)
+        .returning(Reservation.product_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    mark_availability_changed(db, released)
+    return len(released)
+
+
+def release_order(db: Session, order_id: uuid.UUID) -> int:
+    """Free every unit the order still holds (caller commits)"""
+    return release_orders(db, [order_id])
+
+
+def release_reserved_stock(db: Session, order_ids: Iterable[uuid.UUID]) -> None:
+    """
+    Give back the reserved_quantity held by the orders' lines with one
+    aggregated UPDATE across all their products (caller commits).
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+    totals = dict(
+        db.query(OrderLine.product_id, func.sum(OrderLine.quantity))
+        .filter(OrderLine.order_id.in_(order_ids), OrderLine.product_id.isnot(None))
+        .group_by(OrderLine.product_id)
+        .all()
+    )
+    if not totals:
+        return
+    db.execute(
+        update(Product)
+        .where(Product.id.in_(list(totals)))
+        .values(reserved_quantity=func.greatest(
+            0, func.coalesce(Product.reserved_quantity, 0) - case(totals, value=Product.id, else_=0)
+        ))
+        .execution_options(synchronize_session=False)
+    )
+    mark_availability_changed(db, totals)
+    mark_products_changed(db, totals)
@@ -0,0 +1,592 @@
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.product import Product, Category
+from app.db.session import SessionLocal
+
+# Price-range buckets (lower bound inclusive, upper bound exclusive; None = open)
+PRICE_BUCKETS: List[Tuple[float, Optional[float]]] = [
+    (0, 500),
+    (500, 1000),
+    (1000, 2500),
+    (2500, 5000),
+    (5000, None),
+]
+PRICE_PERIODS = ("hourly", "daily", "weekly")
+SORT_OPTIONS = ("price_asc", "price_desc", "quantity_asc", "quantity_desc")
+# Products whose stock changed in a session, handed to the index once it commits
+CHANGED_PRODUCTS_KEY = "facet_changed_products"
+
+# Bounds for (value, slot) pairs, so range lookups include every slot at the edge value
+_FIRST_SLOT = -1
+_LAST_SLOT = float("inf")
+
+# Hard filters an entry is counted under: (is_published, vendor_id), None meaning any
+Scope = Tuple[Optional[bool], Optional[uuid.UUID]]
+
+
+@dataclass
+class FacetEntry:
+    """The facet-relevant columns of one product"""
+    id: uuid.UUID
+    vendor_id: Optional[uuid.UUID]
+    category_id: Optional[uuid.UUID]
+    category_name: Optional[str]
+    is_published: bool
+    is_rentable: bool
+    prices: Dict[str, Optional[float]]
+    available: int
+    attributes: Tuple[Tuple[str, str], ...]
+    created_at: Optional[datetime]
+
+
+@dataclass
+class FacetFilters:
+    categories: Optional[Set[str]] = None
+    price_period: str = "daily"
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    is_rentable: Optional[bool] = None
+    min_available: Optional[int] = None
+    attributes: Dict[str, Set[str]] = field(default_factory=dict)
+    # Hard filters: not facets, never relaxed when counting
+    is_published: Optional[bool] = None
+    vendor_id: Optional[uuid.UUID] = None
+    product_ids: Optional[Set[uuid.UUID]] = None
+
+
+@dataclass
+class FacetResult:
+    ids: List[uuid.UUID]
+    total: int
+    categories: Dict[str, int]
+    price: Dict[int, int]
+    is_rentable: Dict[bool, int]
+    availability: Dict[str, int]
+    attributes: Dict[str, Dict[str, int]]
+
+
+def price_bucket(price: Optional[float]) -> Optional[int]:
+    if price is None:
+        return None
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        if price >= low and (high is None or price < high):
+            return index
+    return None
+
+
+def entry_from_product(product: Product) -> FacetEntry:
+    return FacetEntry(
+        id=product.id,
+        vendor_id=product.vendor_id,
+        category_id=product.category_id,
+        category_name=product.category_rel.name if product.category_rel else None,
+        is_published=bool(product.is_published),
+        is_rentable=bool(product.is_rentable),
+        prices={
+            "hourly": product.rental_price_hourly,
+            "daily": product.rental_price_daily,
+            "weekly": product.rental_price_weekly,
+        },
+        available=(product.quantity_on_hand or 0) - (product.reserved_quantity or 0),
+        attributes=_normalize_attributes(product.attributes),
+        created_at=product.created_at,
+    )
+
+
+def entry_from_row(row) -> FacetEntry:
+    return FacetEntry(
+        id=row[0],
+        vendor_id=row[1],
+        category_id=row[2],
+        category_name=row[3],
+        is_published=bool(row[4]),
+        is_rentable=bool(row[5]),
+        prices={"hourly": row[6], "daily": row[7], "weekly": row[8]},
+        available=(row[9] or 0) - (row[10] or 0),
+        attributes=_normalize_attributes(row[11]),
+        created_at=row[12],
+    )
+
+
+def entry_scopes(entry: FacetEntry) -> Tuple[Scope, ...]:
+    return (
+        (None, None),
+        (entry.is_published, None),
+        (None, entry.vendor_id),
+        (entry.is_published, entry.vendor_id),
+    )
+
+
+def _bump(counter: Counter, key, delta: int) -> None:
+    counter[key] += delta
+    if counter[key] <= 0:
+        del counter[key]
+
+
+@dataclass
+class FacetCounts:
+    """Facet counts of one scope with no facet filter applied, or of a set of matches"""
+    categories: Counter = field(default_factory=Counter)
+    price: Dict[str, Counter] = field(default_factory=lambda: {period: Counter() for period in PRICE_PERIODS})
+    is_rentable: Counter = field(default_factory=Counter)
+    availability: Counter = field(default_factory=Counter)
+    attributes: Dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+
+    def apply(self, entry: FacetEntry, delta: int) -> None:
+        """Count the entry in (delta=1) or out (delta=-1)"""
+        if entry.category_name is not None:
+            _bump(self.categories, entry.category_name, delta)
+        for period in PRICE_PERIODS:
+            bucket = price_bucket(entry.prices.get(period))
+            if bucket is not None:
+                _bump(self.price[period], bucket, delta)
+        _bump(self.is_rentable, entry.is_rentable, delta)
+        _bump(self.availability, "in_stock" if entry.available > 0 else "out_of_stock", delta)
+        for name, value in entry.attributes:
+            _bump(self.attributes[name], value, delta)
+            if not self.attributes[name]:
+                del self.attributes[name]
+
+
+def _post(postings: Dict, key, slot: int, delta: int) -> None:
+    if delta > 0:
+        postings[key].add(slot)
+    else:
+        postings[key].discard(slot)
+        if not postings[key]:
+            del postings[key]
+
+
+def _place(ordered: List[Tuple], item: Tuple, delta: int, keep_sorted: bool) -> None:
+    if delta < 0:
+        index = bisect_left(ordered, item)
+        if index < len(ordered) and ordered[index] == item:
+            del ordered[index]
+    elif keep_sorted:
+        insort(ordered, item)
+    else:
+        ordered.append(item)
+
+
+@dataclass
+class FacetPostings:
+    """
+    Slots (see FacetIndex) per scope and per facet value, and (value, slot)
+    pairs kept sorted for the range filters, so a filter resolves to a set
+    of slots, and a facet value's count to the size of an intersection,
+    without looking at every entry.
+    """
+    scopes: Dict[Scope, Set[int]] = field(default_factory=lambda: defaultdict(set))
+    categories: Dict[str, Set[int]] = field(default_factory=lambda: defaultdict(set))
+    price: Dict[str, Dict[int, Set[int]]] = field(default_factory=lambda: {p: defaultdict(set) for p in PRICE_PERIODS})
+    is_rentable: Dict[bool, Set[int]] = field(default_factory=lambda: defaultdict(set))
+    availability: Dict[str, Set[int]] = field(default_factory=lambda: defaultdict(set))
+    attributes: Dict[str, Dict[str, Set[int]]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(set)))
+    by_price: Dict[str, List[Tuple[float, int]]] = field(default_factory=lambda: {p: [] for p in PRICE_PERIODS})
+    by_available: List[Tuple[int, int]] = field(default_factory=list)
+
+    def apply(self, entry: FacetEntry, slot: int, delta: int, keep_sorted: bool = True) -> None:
+        """Add (delta=1) or remove (delta=-1) the entry; bulk loads pass keep_sorted=False, then sort()"""
+        for scope in entry_scopes(entry):
+            _post(self.scopes, scope, slot, delta)
+        if entry.category_name is not None:
+            _post(self.categories, entry.category_name, slot, delta)
+        for period in PRICE_PERIODS:
+            value = entry.prices.get(period)
+            if value is not None:
+                _post(self.price[period], price_bucket(value), slot, delta)
+                _place(self.by_price[period], (value, slot), delta, keep_sorted)
+        _post(self.is_rentable, entry.is_rentable, slot, delta)
+        _post(self.availability, "in_stock" if entry.available > 0 else "out_of_stock", slot, delta)
+        _place(self.by_available, (entry.available, slot), delta, keep_sorted)
+        for name, value in entry.attributes:
+            _post(self.attributes[name], value, slot, delta)
+            if not self.attributes[name]:
+                del self.attributes[name]
+
+    def sort(self) -> None:
+        for ordered in self.by_price.values():
+            ordered.sort()
+        self.by_available.sort()
+
+    def matching(self, filters: FacetFilters, attr_filters: Dict[str, Set[str]]) -> Dict[object, Set[int]]:
+        """Slots passing each active facet filter, keyed by facet ("category", ("attr", name), ...)"""
+        required: Dict[object, Set[int]] = {}
+        if filters.categories:
+            required["category"] = set().union(*(self.categories.get(name, ()) for name in filters.categories))
+        if filters.min_price is not None or filters.max_price is not None:
+            ordered = self.by_price[filters.price_period]
+            low = 0 if filters.min_price is None else bisect_left(ordered, (filters.min_price, _FIRST_SLOT))
+            high = len(ordered) if filters.max_price is None else bisect_right(ordered, (filters.max_price, _LAST_SLOT))
+            required["price"] = set(map(itemgetter(1), ordered[low:high]))
+        if filters.is_rentable is not None:
+            required["is_rentable"] = self.is_rentable.get(filters.is_rentable, set())
+        if filters.min_available is not None:
+            low = bisect_left(self.by_available, (filters.min_available, _FIRST_SLOT))
+            required["availability"] = set(map(itemgetter(1), self.by_available[low:]))
+        for name, wanted in attr_filters.items():
+            values = self.attributes.get(name, {})
+            required[("attr", name)] = set().union(*(values.get(value, ()) for value in wanted))
+        return required
+
+    def count(self, slots: Set[int], period: str) -> FacetCounts:
+        """Facet counts of the given slots, one set intersection per facet value"""
+        counts = FacetCounts()
+        _count(counts.categories, self.categories, slots)
+        _count(counts.price[period], self.price[period], slots)
+        _count(counts.is_rentable, self.is_rentable, slots)
+        _count(counts.availability, self.availability, slots)
+        for name, values in self.attributes.items():
+            _count(counts.attributes[name], values, slots)
+            if not counts.attributes[name]:
+                del counts.attributes[name]
+        return counts
+
+
+def _count(counter: Counter, postings: Dict, slots: Set[int]) -> None:
+    for key, posted in postings.items():
+        matched = len(slots.intersection(posted))
+        if matched:
+            counter[key] = matched
+
+
+def _intersect(slots: Set[int], others: Iterable[Set[int]]) -> Set[int]:
+    """slots within every other set, intersecting the smallest first"""
+    for other in sorted(others, key=len):
+        slots = slots & other
+    return slots
+
+
+def _normalize_attributes(attributes) -> Tuple[Tuple[str, str], ...]:
+    pairs = []
+    for attr in attributes or []:
+        if isinstance(attr, dict) and attr.get("name") and attr.get("value") is not None:
+            pairs.append((str(attr["name"]), str(attr["value"])))
+    return tuple(pairs)
+
+
+class FacetIndex:
+    """
+    In-process snapshot of the catalog's facet columns, with facet counts
+    per hard-filter scope (published flag, vendor) and the postings of
+    every facet value maintained alongside. Entries live in a list and are
+    referred to by their position ("slot"), which hashes and compares far
+    faster than a UUID in the set intersections.
+
+    A background thread builds it at startup and rebuilds it every
+    `ttl_seconds` to pick up other workers' changes; only a search arriving
+    before the first build waits for one. In between it is kept current
+    entry by entry: upsert()/remove() from the product write paths, and
+    mark_products_changed() from checkout, stock release and imports, whose
+    products are reloaded before the next search. Entries written while a
+    build or reload is reading the database are reloaded again afterwards,
+    so an older read never overwrites them.
+    Requests without facet filters read the maintained counts and a cached
+    sorted id list; filtered requests intersect the postings of the active
+    filters and count each facet value by intersecting its postings with
+    the matches.
+    """
+
+    def __init__(self, ttl_seconds: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self._slots: List[Optional[FacetEntry]] = []
+        self._slot_of: Dict[uuid.UUID, int] = {}
+        self._free: List[int] = []
+        self._counts: Dict[Scope, FacetCounts] = defaultdict(FacetCounts)
+        self._postings = FacetPostings()
+        # (scope, sort option) -> the scope's (slots, ids) in order; dropped on any change
+        self._sorted: Dict[Tuple[Scope, Optional[str]], Tuple[List[int], List[uuid.UUID]]] = {}
+        self._stale: Set[uuid.UUID] = set()
+        # One set per build or reload in flight, collecting the ids written meanwhile
+        self._loading: List[Set[uuid.UUID]] = []
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, session_factory=None) -> None:
+        """Build in a daemon thread now, then again every ttl_seconds"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, args=(session_factory or SessionLocal,), name="facet-index", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wake.set()
+
+    def invalidate(self) -> None:
+        """Rebuild in the background now instead of waiting for the TTL"""
+        self._wake.set()
+
+    def _run(self, session_factory) -> None:
+        while not self._stopping:
+            db = session_factory()
+            try:
+                self.rebuild(db)
+            except Exception as e:
+                print(f"[FACETS] Index rebuild failed: {e}")
+            finally:
+                db.close()
+            self._wake.wait(self.ttl_seconds)
+            self._wake.clear()
+
+    def get(self, product_id: uuid.UUID) -> Optional[FacetEntry]:
+        with self._lock:
+            slot = self._slot_of.get(product_id)
+            return None if slot is None else self._slots[slot]
+
+    def _put(self, entry: Optional[FacetEntry], entry_id: uuid.UUID) -> None:
+        """Replace (or with None, drop) one entry and adjust its counts; hold the lock"""
+        slot = self._slot_of.get(entry_id)
+        if slot is not None:
+            old = self._slots[slot]
+            for scope in entry_scopes(old):
+                self._counts[scope].apply(old, -1)
+            self._postings.apply(old, slot, -1)
+            if not entry:
+                self._slots[slot] = None
+                del self._slot_of[entry_id]
+                self._free.append(slot)
+        if entry:
+            if slot is None:
+                slot = self._free.pop() if self._free else len(self._slots)
+                if slot == len(self._slots):
+                    self._slots.append(None)
+                self._slot_of[entry_id] = slot
+            self._slots[slot] = entry
+            for scope in entry_scopes(entry):
+                self._counts[scope].apply(entry, 1)
+            self._postings.apply(entry, slot, 1)
+        self._sorted.clear()
+
+    def _write(self, entry: Optional[FacetEntry], entry_id: uuid.UUID) -> None:
+        with self._lock:
+            for written in self._loading:
+                written.add(entry_id)
+            if self._built_at is not None:
+                self._put(entry, entry_id)
+
+    def upsert(self, product: Product) -> None:
+        entry = entry_from_product(product)
+        self._write(entry, entry.id)
+
+    def remove(self, product_id: uuid.UUID) -> None:
+        self._write(None, product_id)
+
+    def mark_stale(self, product_ids: Iterable[uuid.UUID]) -> None:
+        """Reload these products' entries before the next search"""
+        with self._lock:
+            self._stale.update(product_ids)
+
+    def _query(self, db: Session):
+        return db.query(
+            Product.id,
+            Product.vendor_id,
+            Product.category_id,
+            Category.name,
+            Product.is_published,
+            Product.is_rentable,
+            Product.rental_price_hourly,
+            Product.rental_price_daily,
+            Product.rental_price_weekly,
+            Product.quantity_on_hand,
+            Product.reserved_quantity,
+            Product.attributes,
+            Product.created_at,
+        ).outerjoin(Category, Product.category_id == Category.id)
+
+    @contextmanager
+    def _loading_ids(self):
+        """Collect the ids upserted or removed while the caller reads the database"""
+        written: Set[uuid.UUID] = set()
+        with self._lock:
+            self._loading.append(written)
+        try:
+            yield written
+        finally:
+            with self._lock:
+                self._loading.remove(written)
+
+    def rebuild(self, db: Session) -> None:
+        """Load the whole catalog and swap it in; ids written meanwhile are reloaded on the next search"""
+        with self._build_lock, self._loading_ids() as written:
+            slots: List[Optional[FacetEntry]] = []
+            counts: Dict[Scope, FacetCounts] = defaultdict(FacetCounts)
+            postings = FacetPostings()
+            for row in self._query(db).yield_per(5000):
+                entry = entry_from_row(row)
+                for scope in entry_scopes(entry):
+                    counts[scope].apply(entry, 1)
+                postings.apply(entry, len(slots), 1, keep_sorted=False)
+                slots.append(entry)
+            postings.sort()
+            with self._lock:
+                self._slots = slots
+                self._slot_of = {entry.id: slot for slot, entry in enumerate(slots)}
+                self._free = []
+                self._counts = counts
+                self._postings = postings
+                self._sorted.clear()
+                self._stale |= written
+                self._built_at = time.monotonic()
+
+    def _refresh(self, db: Session) -> None:
+        if self._built_at is None:
+            # Only before the first build: wait for the one in progress, or run it
+            with self._build_lock:
+                if self._built_at is None:
+                    self.rebuild(db)
+        if self._thread is None:
+            self.start()
+
+        with self._lock:
+            stale, self._stale = self._stale, set()
+        if not stale:
+            return
+        with self._loading_ids() as written:
+            reloaded = {row[0]: entry_from_row(row) for row in self._query(db).filter(Product.id.in_(stale))}
+            with self._lock:
+                for product_id in stale - written:
+                    self._put(reloaded.get(product_id), product_id)
+                self._stale |= stale & written
+
+    def _ordered(self, scope: Scope, sort_by: Optional[str]) -> Tuple[List[int], List[uuid.UUID]]:
+        """The scope's slots and ids in sort order, cached until the next write; hold the lock"""
+        cached = self._sorted.get((scope, sort_by))
+        if cached is None:
+            ordered = [self._slots[slot] for slot in self._postings.scopes.get(scope, ())]
+            self._sort(ordered, sort_by)
+            cached = self._sorted[(scope, sort_by)] = ([self._slot_of[e.id] for e in ordered], [e.id for e in ordered])
+        return cached
+
+    def search(self, db: Session, filters: FacetFilters, sort_by: Optional[str] = None) -> FacetResult:
+        """
+        Matching product ids (sorted) plus disjunctive facet counts: each
+        facet is counted with every *other* active filter applied, so the
+        storefront can show how many results picking another value gives.
+        """
+        self._refresh(db)
+        attr_filters = {name: values for name, values in filters.attributes.items() if values}
+        scope = (filters.is_published, filters.vendor_id)
+        sort_by = sort_by if sort_by in SORT_OPTIONS else None
+        period = filters.price_period
+
+        with self._lock:
+            entries = self._slots
+            scoped = self._counts.get(scope) or FacetCounts()
+            candidates = self._postings.scopes.get(scope, set())
+            required = self._postings.matching(filters, attr_filters)
+            if not required and filters.product_ids is None:
+                ids = self._ordered(scope, sort_by)[1]
+                return FacetResult(
+                    ids=ids,
+                    total=len(ids),
+                    categories=dict(scoped.categories),
+                    price=dict(scoped.price[period]),
+                    is_rentable=dict(scoped.is_rentable),
+                    availability=dict(scoped.availability),
+                    attributes={name: dict(values) for name, values in scoped.attributes.items()},
+                )
+
+            scope_size = len(candidates)
+            if filters.product_ids is not None:
+                searched = {slot for slot in map(self._slot_of.get, filters.product_ids) if slot is not None}
+                candidates = candidates & searched
+            matched = _intersect(candidates, required.values())
+            if len(matched) * 8 > scope_size:
+                # Most of the scope matches: filter its cached order instead of sorting
+                order, ids = self._ordered(scope, sort_by)
+                result_ids = [ids[i] for i, slot in enumerate(order) if slot in matched]
+                matches = []
+            else:
+                result_ids = None
+                matches = [entries[slot] for slot in matched]
+            # Each active facet is counted over what every other filter lets through;
+            # with no other filter that is the whole scope, whose counts are maintained
+            relaxed: Dict[object, FacetCounts] = {}
+            for facet in required:
+                others = [slots for other, slots in required.items() if other != facet]
+                if not others and filters.product_ids is None:
+                    relaxed[facet] = scoped
+                else:
+                    relaxed[facet] = self._postings.count(_intersect(candidates, others), period)
+
+            counted = self._postings.count(matched, period)
+            attributes = {
+                name: dict(values) for name, values in counted.attributes.items() if ("attr", name) not in required
+            }
+            for name in attr_filters:
+                values = relaxed[("attr", name)].attributes.get(name)
+                if values:
+                    attributes[name] = dict(values)
+            result = FacetResult(
+                ids=result_ids,
+                total=len(matched),
+                categories=dict(relaxed.get("category", counted).categories),
+                price=dict(relaxed.get("price", counted).price[period]),
+                is_rentable=dict(relaxed.get("is_rentable", counted).is_rentable),
+                availability=dict(relaxed.get("availability", counted).availability),
+                attributes=attributes,
+            )
+
+        if result.ids is None:
+            self._sort(matches, sort_by)
+            result.ids = [e.id for e in matches]
+        return result
+
+    @staticmethod
+    def _sort(entries: List[FacetEntry], sort_by: Optional[str]) -> None:
+        def price_key(entry: FacetEntry):
+            value = entry.prices.get("daily")
+            return value is None, value or 0
+
+        # Newest first, then a stable sort by the chosen key, so ties keep one order across rebuilds
+        entries.sort(key=lambda e: (e.created_at or datetime.min, e.id.int), reverse=True)
+        if sort_by == "price_asc":
+            entries.sort(key=price_key)
+        elif sort_by == "price_desc":
+            entries.sort(key=lambda e: (e.prices.get("daily") is None, -(e.prices.get("daily") or 0)))
+        elif sort_by == "quantity_asc":
+            entries.sort(key=lambda e: e.available)
+        elif sort_by == "quantity_desc":
+            entries.sort(key=lambda e: -e.available)
+
+
+facet_index = FacetIndex(ttl_seconds=settings.FACET_INDEX_TTL_SECONDS)
+
+
+def mark_products_changed(db: Session, product_ids: Iterable[uuid.UUID]) -> None:
+    """Refresh these products in the facet index once `db` commits (dropped on rollback)"""
+    db.info.setdefault(CHANGED_PRODUCTS_KEY, set()).update(product_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_changed_products(session: Session) -> None:
+    changed = session.info.pop(CHANGED_PRODUCTS_KEY, None)
+    if changed:
+        facet_index.mark_stale(changed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_changed_products(session: Session, previous_transaction) -> None:
+    session.info.pop(CHANGED_PRODUCTS_KEY, None)
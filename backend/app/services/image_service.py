@@ -0,0 +1,152 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.services.upload_service import UPLOAD_DIR
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it products fall back to the original image
+    Image = None
+
+# Longest edge in pixels for each variant, smallest first
+VARIANT_SIZES = {"thumb": 200, "card": 480, "full": 1600}
+VARIANT_DIR = UPLOAD_DIR / "variants"
+VARIANT_DIR.mkdir(exist_ok=True)
+VARIANT_QUALITY = 80
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def variants_enabled() -> bool:
+    return Image is not None and settings.IMAGE_VARIANT_WORKERS > 0
+
+
+def local_filename(url: str) -> Optional[str]:
+    """Filename of an image stored in UPLOAD_DIR, or None for external URLs"""
+    if not url or not url.startswith("/uploads/"):
+        return None
+    name = url[len("/uploads/"):]
+    if not name or "/" in name or name.startswith("."):
+        return None
+    return name
+
+
+def variant_url(filename: str, size: str) -> str:
+    return f"/uploads/variants/{os.path.splitext(filename)[0]}-{size}.webp"
+
+
+def render_variants(filename: str) -> Dict[str, str]:
+    """
+    Resize and recompress one upload into every VARIANT_SIZES entry.
+    Runs inside the worker processes; existing variants are skipped, so
+    calling it again for the same content-addressed file is cheap.
+    """
+    stem = os.path.splitext(filename)[0]
+    variants = {}
+    with Image.open(UPLOAD_DIR / filename) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        for size, edge in VARIANT_SIZES.items():
+            target = VARIANT_DIR / f"{stem}-{size}.webp"
+            if not target.exists():
+                resized = image.copy()
+                resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                fd, tmp_path = tempfile.mkstemp(dir=VARIANT_DIR, prefix=".variant-", suffix=".part")
+                try:
+                    with os.fdopen(fd, "wb") as buffer:
+                        resized.save(buffer, format="WEBP", quality=VARIANT_QUALITY, method=4)
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, target)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+            variants[size] = variant_url(filename, size)
+    return variants
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn keeps the workers clear of the server's threads and DB connections
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def schedule_variants(filename: str) -> Optional[Future]:
+    """Start rendering variants for a fresh upload without waiting for them"""
+    if not variants_enabled():
+        return None
+    return get_executor().submit(render_variants, filename)
+
+
+def build_variants(urls: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """
+    Render variants for every local image in `urls` across the process
+    pool and wait for them. Blocking: call from a worker thread or script,
+    never from the event loop. Images that fail to decode are left out.
+    """
+    if not variants_enabled():
+        return {}
+    futures = {}
+    for url in urls:
+        filename = local_filename(url)
+        if filename and url not in futures and (UPLOAD_DIR / filename).exists():
+            futures[url] = get_executor().submit(render_variants, filename)
+
+    variants = {}
+    for url, future in futures.items():
+        try:
+            variants[url] = future.result()
+        except BrokenProcessPool as e:
+            # A crashed worker poisons the whole pool; start a fresh one next time
+            print(f"Image worker pool failed while rendering {url}: {e}")
+            shutdown_executor()
+        except Exception as e:
+            print(f"Failed to render variants for {url}: {e}")
+    return variants
+
+
+def refresh_product_variants(product_id: uuid.UUID) -> None:
+    """Background task: render and record variants for a product's current images"""
+    from app.db.session import SessionLocal
+    from app.db.models.product import Product
+
+    if not variants_enabled():
+        return
+    db = SessionLocal()
+    try:
+        product = db.query(Product).filter(Product.id == product_id).first()
+        if not product or not product.images:
+            return
+        variants = build_variants(product.images)
+        if variants != (product.image_variants or {}):
+            product.image_variants = variants
+            db.commit()
+    finally:
+        db.close()
+
+
+def product_image_variants(images: List[str], recorded: Optional[Dict[str, Dict[str, str]]]) -> List[Dict[str, str]]:
+    """Per-size URLs for each image, falling back to the original until variants exist"""
+    recorded = recorded or {}
+    return [recorded.get(url) or {size: url for size in VARIANT_SIZES} for url in images]
@@ -0,0 +1,66 @@
+import os
+import threading
+from typing import Dict, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# kind -> (prefix, Postgres sequence). Each sequence's INCREMENT BY is the
+# block size a worker reserves per round trip (see migration m7n8o9p0q1r2).
+DOCUMENT_SEQUENCES: Dict[str, Tuple[str, str]] = {
+    "order": ("ORD", "order_number_seq"),
+    "invoice": ("INV", "invoice_number_seq"),
+    "quotation": ("QUO", "quotation_number_seq"),
+}
+NUMBER_WIDTH = 8
+
+
+class BlockAllocator:
+    """
+    Hands out numbers from a block reserved with a single nextval().
+    The sequence advances by a whole block per call, so workers never
+    share a number; numbers left in a block when a worker exits are
+    skipped (gaps are fine, duplicates are not).
+    """
+
+    def __init__(self, sequence: str):
+        self.sequence = sequence
+        self._next = 0
+        self._limit = 0
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._next = self._limit = 0
+
+    def allocate(self, db: Session) -> int:
+        with self._lock:
+            if self._next >= self._limit:
+                # nextval is non-transactional: a rolled-back request still consumes its block
+                start, block_size = db.execute(text(
+                    f"SELECT nextval('{self.sequence}'), increment_by FROM pg_sequences WHERE sequencename = :name"
+                ), {"name": self.sequence}).one()
+                self._next, self._limit = start, start + block_size
+            number = self._next
+            self._next += 1
+            return number
+
+
+_allocators = {kind: BlockAllocator(sequence) for kind, (_, sequence) in DOCUMENT_SEQUENCES.items()}
+
+
+def _reset_after_fork() -> None:
+    # A forked worker must not reuse the parent's partially used blocks
+    for allocator in _allocators.values():
+        allocator._lock = threading.Lock()
+        allocator.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def next_document_number(db: Session, kind: str) -> str:
+    """Next human-readable number for an order, invoice or quotation, e.g. ORD-00000101"""
+    prefix, _ = DOCUMENT_SEQUENCES[kind]
+    return f"{prefix}-{_allocators[kind].allocate(db):0{NUMBER_WIDTH}d}"
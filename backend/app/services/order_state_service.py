@@ -0,0 +1,112 @@
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.models.order import OrderEvent, OrderStatus, RentalOrder
+
+# Statuses an order may move to from each status
+ORDER_TRANSITIONS = {
+    OrderStatus.PENDING: {OrderStatus.CONFIRMED, OrderStatus.CANCELLED},
+    OrderStatus.CONFIRMED: {OrderStatus.PICKED_UP, OrderStatus.CANCELLED},
+    # Out orders complete only through RETURNED, where update_order settles the late fee and deposit
+    OrderStatus.PICKED_UP: {OrderStatus.ACTIVE, OrderStatus.RETURNED},
+    OrderStatus.ACTIVE: {OrderStatus.RETURNED},
+    OrderStatus.RETURNED: {OrderStatus.COMPLETED},
+    OrderStatus.COMPLETED: set(),
+    OrderStatus.CANCELLED: set(),
+}
+# Statuses that free the order's stock and reservations
+RELEASING_STATUSES = {OrderStatus.COMPLETED, OrderStatus.CANCELLED}
+
+# pg_advisory_xact_lock key serialising appends to order_events
+EVENT_LOG_LOCK_ID = 0x6F72646576  # "ordev"
+PENDING_EVENTS_KEY = "pending_order_events"
+
+
+class TransitionError(ValueError):
+    """The order cannot move to the requested status; message is safe to show"""
+
+
+def can_transition(current: OrderStatus, new: OrderStatus) -> bool:
+    return new in ORDER_TRANSITIONS.get(current, set())
+
+
+def record_event(
+    db: Session,
+    order: RentalOrder,
+    from_status: Optional[OrderStatus],
+    to_status: OrderStatus,
+    source: str,
+    actor_id: Optional[uuid.UUID] = None,
+    data: Optional[Dict[str, Any]] = None
+) -> None:
+    """Queue an event; it is written with the caller's commit and dropped on rollback"""
+    db.info.setdefault(PENDING_EVENTS_KEY, []).append({
+        "order_id": order.id,
+        "customer_id": order.customer_id,
+        "vendor_id": order.vendor_id,
+        "from_status": from_status,
+        "to_status": to_status,
+        "actor_id": actor_id,
+        "source": source,
+        "data": data,
+    })
+
+
+def transition(
+    db: Session,
+    order: RentalOrder,
+    new_status: OrderStatus,
+    source: str,
+    actor_id: Optional[uuid.UUID] = None,
+    data: Optional[Dict[str, Any]] = None
+) -> OrderStatus:
+    """Move one order along ORDER_TRANSITIONS and log it; returns the previous status"""
+    previous = order.status
+    if not can_transition(previous, new_status):
+        raise TransitionError(f"Cannot move from {previous.value} to {new_status.value}")
+    order.status = new_status
+    record_event(db, order, previous, new_status, source, actor_id, data)
+    return previous
+
+
+@event.listens_for(Session, "before_commit")
+def _append_pending_events(session: Session) -> None:
+    """
+    Write queued events as the last statements before COMMIT. The advisory
+    lock makes appends commit in id order, so a consumer reading past its
+    offset never misses an event that commits late with a smaller id; taking
+    it only here keeps it from being held while other row locks are awaited.
+    """
+    pending = session.info.pop(PENDING_EVENTS_KEY, None)
+    if not pending:
+        return
+    session.flush()
+    session.execute(select(func.pg_advisory_xact_lock(EVENT_LOG_LOCK_ID)))
+    session.execute(insert(OrderEvent), pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending_events(session: Session, previous_transaction) -> None:
+    session.info.pop(PENDING_EVENTS_KEY, None)
+
+
+def read_events(
+    db: Session,
+    after: int = 0,
+    limit: int = 100,
+    order_id: Optional[uuid.UUID] = None,
+    customer_id: Optional[uuid.UUID] = None,
+    vendor_id: Optional[uuid.UUID] = None
+) -> List[OrderEvent]:
+    """Events with id > after, oldest first; pass the last id back as `after` to continue"""
+    query = db.query(OrderEvent).filter(OrderEvent.id > after)
+    if order_id:
+        query = query.filter(OrderEvent.order_id == order_id)
+    if customer_id:
+        query = query.filter(OrderEvent.customer_id == customer_id)
+    if vendor_id:
+        query = query.filter(OrderEvent.vendor_id == vendor_id)
+    return query.order_by(OrderEvent.id).limit(limit).all()
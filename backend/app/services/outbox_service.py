@@ -0,0 +1,163 @@
+import random
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.db.models.outbox import OutboxMessage, OutboxStatus
+from app.db.models.wallet import WalletTransaction
+
+EMAIL = "email"
+WALLET_CREDIT = "wallet.credit"
+
+
+def enqueue(db: Session, topic: str, payload: Dict[str, Any]) -> OutboxMessage:
+    """
+    Record a side effect to run after the caller's transaction commits.
+    Nothing happens until the caller commits; a rollback drops it too.
+    """
+    if topic not in HANDLERS:
+        raise ValueError(f"Unknown outbox topic: {topic}")
+    message = OutboxMessage(topic=topic, payload=payload)
+    db.add(message)
+    return message
+
+
+def enqueue_email(db: Session, to_email: str, subject: str, html_content: str) -> OutboxMessage:
+    return enqueue(db, EMAIL, {"to_email": to_email, "subject": subject, "html_content": html_content})
+
+
+# =====================
+# Handlers
+# =====================
+
+def _send_email(db: Session, payload: Dict[str, Any]) -> None:
+    from app.services.email_service import send_email
+    if not send_email(payload["to_email"], payload["subject"], payload["html_content"]):
+        raise RuntimeError(f"SMTP delivery to {payload['to_email']} failed")
+
+
+def _credit_wallet(db: Session, payload: Dict[str, Any]) -> None:
+    from app.services.wallet_service import wallet_service
+    reference_type = payload.get("reference_type")
+    reference_id = payload.get("reference_id")
+    # A retry after a crash between the credit and marking the message done must not pay twice
+    if reference_type and reference_id and db.query(WalletTransaction.id).filter(
+        WalletTransaction.reference_type == reference_type,
+        WalletTransaction.reference_id == uuid.UUID(reference_id)
+    ).first():
+        return
+    wallet_service.credit_wallet(
+        db,
+        uuid.UUID(payload["user_id"]),
+        payload["amount"],
+        payload["description"],
+        reference_type,
+        reference_id
+    )
+
+
+HANDLERS: Dict[str, Callable[[Session, Dict[str, Any]], None]] = {
+    EMAIL: _send_email,
+    WALLET_CREDIT: _credit_wallet,
+}
+
+
+# =====================
+# Worker
+# =====================
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, capped at OUTBOX_BACKOFF_MAX_SECONDS"""
+    delay = min(settings.OUTBOX_BACKOFF_MAX_SECONDS, settings.OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_batch(db: Session, limit: int):
+    """
+    Lease up to `limit` due messages. SKIP LOCKED lets several workers
+    drain the table without taking the same row; the lease pushes
+    available_at out so a worker that dies mid-batch hands its messages
+    back once it expires.
+    """
+    due = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.status == OutboxStatus.PENDING, OutboxMessage.available_at <= func.now())
+        .order_by(OutboxMessage.available_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(due.scalar_subquery()))
+        .values(
+            attempts=OutboxMessage.attempts + 1,
+            available_at=func.now() + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        )
+        .returning(OutboxMessage.id, OutboxMessage.topic, OutboxMessage.payload, OutboxMessage.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return claimed
+
+
+def _finish(db: Session, message_id: uuid.UUID, **values) -> None:
+    db.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id == message_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def process_batch(db: Session, limit: Optional[int] = None) -> int:
+    """Run one batch of due messages; returns how many were claimed"""
+    claimed = claim_batch(db, limit or settings.OUTBOX_BATCH_SIZE)
+    for message_id, topic, payload, attempts in claimed:
+        try:
+            HANDLERS[topic](db, payload)
+        except Exception as e:
+            db.rollback()
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                print(f"[OUTBOX] {topic} {message_id} dead after {attempts} attempts: {error}")
+                _finish(db, message_id, status=OutboxStatus.DEAD, last_error=error, processed_at=func.now())
+            else:
+                delay = backoff_delay(attempts)
+                print(f"[OUTBOX] {topic} {message_id} attempt {attempts} failed, retrying in {delay:.0f}s: {error}")
+                _finish(db, message_id, last_error=error, available_at=func.now() + timedelta(seconds=delay))
+            continue
+        _finish(db, message_id, status=OutboxStatus.DONE, last_error=None, processed_at=func.now())
+    return len(claimed)
+
+
+def retry_message(db: Session, message: OutboxMessage) -> None:
+    """Put a dead message back in the queue with a fresh attempt budget (caller commits)"""
+    message.status = OutboxStatus.PENDING
+    message.attempts = 0
+    message.available_at = func.now()
+    message.processed_at = None
+
+
+def run_worker(session_factory, once: bool = False) -> None:
+    """Drain the outbox, sleeping OUTBOX_POLL_INTERVAL_SECONDS whenever it is empty"""
+    while True:
+        db = session_factory()
+        try:
+            while process_batch(db):
+                pass
+        except Exception as e:
+            print(f"[OUTBOX] Worker error: {e}")
+            db.rollback()
+        finally:
+            db.close()
+        if once:
+            return
+        time.sleep(settings.OUTBOX_POLL_INTERVAL_SECONDS)
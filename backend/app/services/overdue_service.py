@@ -0,0 +1,132 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import Integer, Numeric, and_, cast, literal, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.db.models.order import RentalOrder, OrderStatus
+from app.db.models.user import User
+from app.services.outbox_service import enqueue_email
+
+LATE_FEE_DAILY_RATE = 0.10  # of the order total, per started day late
+SECONDS_PER_DAY = 24 * 60 * 60
+# Orders whose items are still with the customer
+OUT_STATUSES = [OrderStatus.PICKED_UP, OrderStatus.ACTIVE]
+CLOSED_STATUSES = [OrderStatus.RETURNED, OrderStatus.COMPLETED, OrderStatus.CANCELLED]
+
+
+def approaching_return_filter(now: datetime):
+    """Open orders whose return date is past or within a day (ix_rental_orders_*open_return_created_at_id)"""
+    return and_(
+        RentalOrder.return_date.isnot(None),
+        RentalOrder.return_date <= now + timedelta(days=1),
+        RentalOrder.status.notin_(CLOSED_STATUSES)
+    )
+
+
+def pending_return_filter(now: datetime):
+    """Picked-up orders whose return date has passed (ix_rental_orders_*pending_return)"""
+    return and_(RentalOrder.status == OrderStatus.PICKED_UP, RentalOrder.return_date <= now)
+
+
+def days_late(due: Optional[datetime], at: datetime) -> int:
+    """Started days between the due date and `at`; 0 when not late"""
+    if not due or at <= due:
+        return 0
+    return (at - due).days + 1
+
+
+def late_fee_for(total_amount: Optional[float], days: int) -> float:
+    return round(float(total_amount or 0) * LATE_FEE_DAILY_RATE * days, 2)
+
+
+@dataclass
+class SweepResult:
+    updated: int = 0
+    cleared: int = 0
+    reminders: int = 0
+
+
+def overdue_email(customer: User, order_number: str, due: datetime, days: int, fee: float):
+    """(to, subject, html) for the daily overdue reminder"""
+    subject = f"Rental Overdue - {order_number}"
+    html_content = f"""
+    <html>
+        <body>
+            <div style="font-family: Arial, sans-serif; padding: 20px;">
+                <h2 style="color: #DC2626;">Your rental is overdue</h2>
+                <p>Hi {customer.first_name},</p>
+                <p>Rental order <strong>{order_number}</strong> was due back on <strong>{due.strftime("%B %d, %Y")}</strong> and is now {days} day(s) late.</p>
+
+                <div style="background-color: #fef2f2; padding: 15px; border-radius: 8px; margin: 20px 0;">
+                    <p style="margin: 0;"><strong>Late fee so far: ₹{fee:.2f}</strong></p>
+                    <p style="margin: 5px 0 0;">The fee grows each day until the items are returned, and is deducted from your security deposit.</p>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+    return customer.email, subject, html_content
+
+
+def sweep_overdue(db: Session, now: Optional[datetime] = None) -> SweepResult:
+    """
+    Recompute overdue_days and accrued_late_fee for every order still out
+    past its rental_end_date with one UPDATE, touching only rows whose day
+    count changed, and queue one reminder per order per new day late.
+    Orders whose end date moved back into the future are cleared. Safe to
+    run concurrently: a second sweeper finds nothing left to change.
+    """
+    now = now or datetime.now()
+    result = SweepResult()
+    days = cast(
+        func.floor(func.extract("epoch", literal(now) - RentalOrder.rental_end_date) / SECONDS_PER_DAY) + 1,
+        Integer
+    )
+    # Served by the partial index ix_rental_orders_out_end_date
+    out_and_late = and_(RentalOrder.status.in_(OUT_STATUSES), RentalOrder.rental_end_date < now)
+
+    changed = db.execute(
+        update(RentalOrder)
+        .where(out_and_late, RentalOrder.overdue_days.is_distinct_from(days))
+        .values(
+            overdue_days=days,
+            accrued_late_fee=func.round(
+                cast(func.coalesce(RentalOrder.total_amount, 0), Numeric) * LATE_FEE_DAILY_RATE * days, 2
+            ),
+        )
+        .returning(
+            RentalOrder.customer_id, RentalOrder.order_number, RentalOrder.rental_end_date,
+            RentalOrder.overdue_days, RentalOrder.accrued_late_fee
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    result.updated = len(changed)
+
+    result.cleared = db.execute(
+        update(RentalOrder)
+        .where(
+            RentalOrder.status.in_(OUT_STATUSES),
+            RentalOrder.rental_end_date >= now,
+            RentalOrder.overdue_days > 0
+        )
+        .values(overdue_days=0, accrued_late_fee=0)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    if changed:
+        customers = {
+            user.id: user for user in db.query(User).filter(User.id.in_({row.customer_id for row in changed}))
+        }
+        for row in changed:
+            customer = customers.get(row.customer_id)
+            if customer:
+                enqueue_email(db, *overdue_email(
+                    customer, row.order_number, row.rental_end_date, row.overdue_days, row.accrued_late_fee
+                ))
+                result.reminders += 1
+
+    db.commit()
+    return result
@@ -0,0 +1,182 @@
+import math
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.db.models.product import Product
+
+HOURS_PER_DAY = 24
+HOURS_PER_WEEK = 7 * HOURS_PER_DAY
+TAX_RATE = 18  # GST, percent
+
+
+class PricingError(ValueError):
+    """A line that cannot be priced; the message is safe to show to the client"""
+
+
+@dataclass
+class PriceRequest:
+    product_id: uuid.UUID
+    start: datetime
+    end: datetime
+    quantity: int = 1
+
+
+@dataclass
+class PriceQuote:
+    product_id: uuid.UUID
+    product_name: str
+    vendor_id: Optional[uuid.UUID]
+    start: datetime
+    end: datetime
+    quantity: int
+    billed_hours: int
+    weeks: int
+    days: int
+    hours: int
+    unit_price: float   # one unit for the whole period
+    total_price: float  # unit_price * quantity
+
+
+def billable_hours(start: datetime, end: datetime) -> int:
+    """Rental length in started hours, at least one"""
+    if end <= start:
+        raise PricingError("Rental end must be after its start")
+    return max(1, math.ceil((end - start).total_seconds() / 3600))
+
+
+def naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def _rate(value: Optional[float]) -> Optional[float]:
+    return value if value and value > 0 else None
+
+
+def cheapest_combination(
+    hours: int,
+    hourly: Optional[float],
+    daily: Optional[float],
+    weekly: Optional[float]
+) -> Optional[Tuple[int, int, int, float]]:
+    """
+    Cheapest (weeks, days, hours, cost) covering at least `hours`.
+    Each rate is linear, so for weeks the optimum is none, as many as fit,
+    or one more than fit, and the same holds for days within what weeks
+    leave over; checking those few candidates is exact. None when the
+    product has no usable rate.
+    """
+    hourly, daily, weekly = _rate(hourly), _rate(daily), _rate(weekly)
+    week_options = {0}
+    if weekly:
+        week_options |= {hours // HOURS_PER_WEEK, math.ceil(hours / HOURS_PER_WEEK)}
+
+    best = None
+    for weeks in week_options:
+        remaining = max(0, hours - weeks * HOURS_PER_WEEK)
+        day_options = {0}
+        if daily:
+            day_options |= {remaining // HOURS_PER_DAY, math.ceil(remaining / HOURS_PER_DAY)}
+        for days in day_options:
+            leftover = max(0, remaining - days * HOURS_PER_DAY)
+            if leftover and not hourly:
+                continue
+            cost = weeks * (weekly or 0) + days * (daily or 0) + leftover * (hourly or 0)
+            if best is None or cost < best[3]:
+                best = (weeks, days, leftover, cost)
+    return best
+
+
+def load_products(db: Session, product_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, Product]:
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+    return {p.id: p for p in db.query(Product).filter(Product.id.in_(product_ids)).all()}
+
+
+def price_lines(
+    db: Session,
+    requests: Iterable[PriceRequest],
+    products: Optional[Dict[uuid.UUID, Product]] = None
+) -> List[PriceQuote]:
+    """
+    Price every request against current product rates, loading all the
+    products in one query unless the caller already has them. Raises
+    PricingError naming the first line that cannot be priced.
+    """
+    requests = list(requests)
+    if products is None:
+        products = load_products(db, (r.product_id for r in requests))
+
+    quotes = []
+    for index, request in enumerate(requests, start=1):
+        product = products.get(request.product_id)
+        if not product:
+            raise PricingError(f"Line {index}: product not found")
+        if not product.is_rentable:
+            raise PricingError(f"Line {index}: {product.name} is not available for rent")
+        if request.quantity < 1:
+            raise PricingError(f"Line {index}: quantity must be at least 1")
+
+        try:
+            hours = billable_hours(naive(request.start), naive(request.end))
+        except PricingError as e:
+            raise PricingError(f"Line {index}: {e}")
+        combination = cheapest_combination(
+            hours, product.rental_price_hourly, product.rental_price_daily, product.rental_price_weekly
+        )
+        if combination is None:
+            raise PricingError(f"Line {index}: {product.name} has no rental price for this period")
+        weeks, days, leftover, cost = combination
+
+        unit_price = round(cost, 2)
+        quotes.append(PriceQuote(
+            product_id=product.id,
+            product_name=product.name,
+            vendor_id=product.vendor_id,
+            start=request.start,
+            end=request.end,
+            quantity=request.quantity,
+            billed_hours=hours,
+            weeks=weeks,
+            days=days,
+            hours=leftover,
+            unit_price=unit_price,
+            total_price=round(unit_price * request.quantity, 2)
+        ))
+    return quotes
+
+
+def apply_quoted_prices(quotes: List[PriceQuote], quoted_lines: Iterable) -> None:
+    """
+    Replace list prices with the ones agreed on a quotation. Each quote
+    takes the prices of an unused quotation line (objects with product_id,
+    rental dates, quantity, unit_price and total_price) for the same
+    product, window and quantity; raises PricingError for a line that was
+    never quoted.
+    """
+    unused = list(quoted_lines)
+    for index, quote in enumerate(quotes, start=1):
+        key = (quote.product_id, naive(quote.start), naive(quote.end), quote.quantity)
+        line = next((
+            line for line in unused
+            if (line.product_id, naive(line.rental_start_date), naive(line.rental_end_date), line.quantity) == key
+        ), None)
+        if line is None:
+            raise PricingError(f"Line {index}: {quote.product_name} does not match a line of the quotation")
+        unused.remove(line)
+        quote.unit_price = line.unit_price
+        quote.total_price = line.total_price
+
+
+def order_totals(subtotal: float, security_deposit: float = 0) -> Dict[str, float]:
+    tax_amount = round(subtotal * (TAX_RATE / 100), 2)
+    return {
+        "subtotal": round(subtotal, 2),
+        "tax_rate": TAX_RATE,
+        "tax_amount": tax_amount,
+        "total_amount": round(subtotal + tax_amount + security_deposit, 2),
+    }
@@ -0,0 +1,279 @@
+import csv
+import io
+import itertools
+import json
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError, field_validator
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, joinedload
+
+from app.db.models.product import Product, Category
+from app.services.facet_service import mark_products_changed
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Column order for CSV export; import accepts the same columns in any order.
+# In CSV, images are "|"-separated and attributes are "name=value;name=value".
+PRODUCT_COLUMNS = [
+    "name", "description", "category", "images", "is_rentable",
+    "rental_price_hourly", "rental_price_daily", "rental_price_weekly",
+    "cost_price", "sales_price", "quantity_on_hand", "is_published", "attributes",
+]
+
+
+class ProductImportRow(BaseModel):
+    name: str
+    description: Optional[str] = None
+    category: Optional[str] = None
+    images: List[str] = []
+    is_rentable: bool = True
+    rental_price_hourly: Optional[float] = None
+    rental_price_daily: Optional[float] = None
+    rental_price_weekly: Optional[float] = None
+    cost_price: float = 0
+    sales_price: float = 0
+    quantity_on_hand: int = 0
+    is_published: bool = False
+    attributes: List[Dict[str, str]] = []
+
+    @field_validator("name")
+    @classmethod
+    def name_not_blank(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("name is required")
+        return value
+
+    @field_validator("images", mode="before")
+    @classmethod
+    def split_images(cls, value):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [url.strip() for url in value.split("|") if url.strip()]
+        return value
+
+    @field_validator("attributes", mode="before")
+    @classmethod
+    def split_attributes(cls, value):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            attributes = []
+            for pair in value.split(";"):
+                if not pair.strip():
+                    continue
+                name, sep, attr_value = pair.partition("=")
+                if not sep or not name.strip() or not attr_value.strip():
+                    raise ValueError("attributes must look like name=value;name=value")
+                attributes.append({"name": name.strip(), "value": attr_value.strip()})
+            return attributes
+        return value
+
+    @field_validator("attributes")
+    @classmethod
+    def attributes_have_name_and_value(cls, value: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        for attr in value:
+            if set(attr) != {"name", "value"}:
+                raise ValueError("each attribute needs exactly a name and a value")
+        return value
+
+    @field_validator("quantity_on_hand")
+    @classmethod
+    def quantity_not_negative(cls, value: int) -> int:
+        if value < 0:
+            raise ValueError("quantity_on_hand cannot be negative")
+        return value
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    failed: int = 0
+    categories_created: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add_error(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+
+def detect_format(filename: Optional[str], requested: Optional[str]) -> Optional[str]:
+    if requested:
+        return requested if requested in IMPORT_FORMATS else None
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def iter_rows(stream: BinaryIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (row number, raw row) pairs from a binary upload without reading
+    it all into memory. Rows that cannot be parsed are yielded as an
+    Exception so they can be reported alongside validation errors.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for raw in reader:
+            # Empty cells fall back to the field defaults; DictReader counts the header as line 1
+            yield reader.line_num, {k: v for k, v in raw.items() if k and v not in (None, "")}
+        return
+
+    for line_num, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_num, ValueError(f"invalid JSON: {e.msg}")
+            continue
+        if not isinstance(raw, dict):
+            yield line_num, ValueError("each line must be a JSON object")
+            continue
+        yield line_num, {k: v for k, v in raw.items() if v is not None}
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()
+    )
+
+
+def resolve_categories(db: Session, names: Iterable[str], known: Dict[str, uuid.UUID]) -> int:
+    """Fill `known` with ids for `names`, creating missing categories in one statement"""
+    missing = {name for name in names if name and name not in known}
+    if not missing:
+        return 0
+    created = db.execute(
+        pg_insert(Category)
+        .values([{"id": uuid.uuid4(), "name": name, "is_active": True} for name in sorted(missing)])
+        .on_conflict_do_nothing(index_elements=[Category.name])
+        .returning(Category.id)
+    ).all()
+    rows = db.query(Category.name, Category.id).filter(Category.name.in_(missing)).all()
+    known.update({name: category_id for name, category_id in rows})
+    return len(created)
+
+
+def import_products(db: Session, stream: BinaryIO, fmt: str, vendor_id: uuid.UUID) -> ImportReport:
+    """
+    Validate and insert products from a CSV/NDJSON stream in batches of
+    IMPORT_BATCH_SIZE, one multi-row INSERT and one commit per batch.
+    Invalid rows are skipped and reported by row number; valid rows in
+    the same batch are still inserted. Blocking; run off the event loop.
+    """
+    report = ImportReport()
+    categories: Dict[str, uuid.UUID] = {}
+    rows = iter_rows(stream, fmt)
+
+    while batch := list(itertools.islice(rows, IMPORT_BATCH_SIZE)):
+        valid: List[ProductImportRow] = []
+        for row_num, raw in batch:
+            if isinstance(raw, Exception):
+                report.add_error(row_num, str(raw))
+                continue
+            try:
+                valid.append(ProductImportRow.model_validate(raw))
+            except ValidationError as e:
+                report.add_error(row_num, _format_validation_error(e))
+        if not valid:
+            continue
+
+        report.categories_created += resolve_categories(db, (row.category for row in valid), categories)
+        products = [
+            {
+                "id": uuid.uuid4(),
+                "vendor_id": vendor_id,
+                "name": row.name,
+                "description": row.description,
+                "category_id": categories.get(row.category) if row.category else None,
+                "images": row.images,
+                "is_rentable": row.is_rentable,
+                "rental_price_hourly": row.rental_price_hourly,
+                "rental_price_daily": row.rental_price_daily,
+                "rental_price_weekly": row.rental_price_weekly,
+                "cost_price": row.cost_price,
+                "sales_price": row.sales_price,
+                "quantity_on_hand": row.quantity_on_hand,
+                "reserved_quantity": 0,
+                "is_published": row.is_published,
+                "attributes": row.attributes,
+            }
+            for row in valid
+        ]
+        db.execute(insert(Product), products)
+        mark_products_changed(db, (product["id"] for product in products))
+        db.commit()
+        report.created += len(valid)
+
+    return report
+
+
+def product_to_row(product: Product) -> Dict[str, Any]:
+    """Flat export row in the same shape import_products accepts"""
+    return {
+        "name": product.name,
+        "description": product.description,
+        "category": product.category_rel.name if product.category_rel else None,
+        "images": product.images or [],
+        "is_rentable": product.is_rentable,
+        "rental_price_hourly": product.rental_price_hourly,
+        "rental_price_daily": product.rental_price_daily,
+        "rental_price_weekly": product.rental_price_weekly,
+        "cost_price": product.cost_price,
+        "sales_price": product.sales_price,
+        "quantity_on_hand": product.quantity_on_hand,
+        "is_published": product.is_published,
+        "attributes": product.attributes or [],
+    }
+
+
+def _csv_value(column: str, value: Any) -> Any:
+    if value is None:
+        return ""
+    if column == "images":
+        return "|".join(value)
+    if column == "attributes":
+        return ";".join(f"{attr['name']}={attr['value']}" for attr in value)
+    return value
+
+
+def export_products(db: Session, fmt: str, vendor_id: Optional[uuid.UUID] = None) -> Iterator[str]:
+    """
+    Stream products as CSV or NDJSON text chunks, EXPORT_BATCH_SIZE rows
+    per server-side fetch via yield_per, so memory stays flat however
+    large the catalog is.
+    """
+    query = db.query(Product).options(joinedload(Product.category_rel)).order_by(Product.created_at, Product.id)
+    if vendor_id:
+        query = query.filter(Product.vendor_id == vendor_id)
+    products = query.execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE)
+
+    if fmt == "ndjson":
+        for product in products:
+            yield json.dumps(product_to_row(product)) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(PRODUCT_COLUMNS)
+    for count, product in enumerate(products, start=1):
+        row = product_to_row(product)
+        writer.writerow([_csv_value(column, row[column]) for column in PRODUCT_COLUMNS])
+        if count % 100 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
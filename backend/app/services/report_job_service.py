@@ -0,0 +1,307 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+import traceback
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.db.models.invoice import Invoice
+from app.db.models.order import RentalOrder, OrderStatus
+from app.db.models.product import Product
+from app.db.models.report_job import ReportJob, ReportJobStatus
+from app.db.models.user import User, UserRole
+from app.services.report_service import EXPORT_FORMATS, ReportFilters, encode_report, report_rows
+
+BACKEND_DIR = Path(__file__).parent.parent.parent
+GZIP_MEDIA_TYPE = "application/gzip"
+
+
+def report_dir() -> Path:
+    path = Path(settings.REPORT_DIR)
+    path = path if path.is_absolute() else BACKEND_DIR / path
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def artifact_path(job: ReportJob) -> Optional[Path]:
+    return report_dir() / job.file_name if job.file_name else None
+
+
+def download_name(job: ReportJob) -> str:
+    name = f"{job.report_type}_report.{EXPORT_FORMATS[job.format][1]}"
+    return name + ".gz" if job.compressed else name
+
+
+def media_type(job: ReportJob) -> str:
+    return GZIP_MEDIA_TYPE if job.compressed else EXPORT_FORMATS[job.format][0]
+
+
+# =====================
+# Cache keys
+# =====================
+
+def _scope(user: User) -> str:
+    """Users who see the same rows share cached reports"""
+    if user.role == UserRole.VENDOR:
+        return f"vendor:{user.id}"
+    if user.role == UserRole.CUSTOMER:
+        return f"customer:{user.id}"
+    return "all"
+
+
+def data_version(db: Session, report_type: str, user: User) -> str:
+    """
+    Row count and newest updated_at of the rows a report reads, in the
+    user's scope. Any insert, update or delete there changes it, which
+    retires cached artifacts without tracking writes explicitly.
+    """
+    if report_type == "orders":
+        query = db.query(func.count(RentalOrder.id), func.max(RentalOrder.updated_at))
+        if user.role == UserRole.VENDOR:
+            query = query.filter(RentalOrder.vendor_id == user.id)
+        elif user.role == UserRole.CUSTOMER:
+            query = query.filter(RentalOrder.customer_id == user.id)
+    elif report_type == "products":
+        query = db.query(func.count(Product.id), func.max(Product.updated_at))
+        if user.role == UserRole.VENDOR:
+            query = query.filter(Product.vendor_id == user.id)
+    else:
+        query = db.query(func.count(Invoice.id), func.max(Invoice.updated_at))
+        if user.role == UserRole.VENDOR:
+            query = query.join(RentalOrder, Invoice.order_id == RentalOrder.id).filter(RentalOrder.vendor_id == user.id)
+        elif user.role == UserRole.CUSTOMER:
+            query = query.filter(Invoice.customer_id == user.id)
+    count, latest = query.one()
+    version = f"{count}:{latest.isoformat() if latest else ''}"
+    if report_type == "revenue":
+        # The default window ends this month, so the same request changes with the date
+        version += f":{date.today().isoformat()}"
+    return version
+
+
+def filters_to_params(filters: ReportFilters) -> dict:
+    return {
+        "start_date": filters.start_date.isoformat() if filters.start_date else None,
+        "end_date": filters.end_date.isoformat() if filters.end_date else None,
+        "status": filters.status.value if filters.status else None,
+    }
+
+
+def params_to_filters(params: dict) -> ReportFilters:
+    return ReportFilters(
+        start_date=date.fromisoformat(params["start_date"]) if params.get("start_date") else None,
+        end_date=date.fromisoformat(params["end_date"]) if params.get("end_date") else None,
+        status=OrderStatus(params["status"]) if params.get("status") else None,
+    )
+
+
+def cache_key(report_type: str, export_format: str, compressed: bool, params: dict, scope: str, version: str) -> str:
+    material = json.dumps([report_type, export_format, compressed, params, scope, version], sort_keys=True)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+# =====================
+# Submitting
+# =====================
+
+def submit_job(
+    db: Session,
+    user: User,
+    report_type: str,
+    export_format: str,
+    compressed: bool,
+    filters: ReportFilters
+) -> ReportJob:
+    """
+    Queue a report, or finish it at once from a cached artifact with the
+    same key. A repeat of the user's own queued or running request returns
+    that job instead of queueing another.
+    """
+    params = filters_to_params(filters)
+    key = cache_key(report_type, export_format, compressed, params, _scope(user), data_version(db, report_type, user))
+    job = ReportJob(
+        id=uuid.uuid4(), user_id=user.id, report_type=report_type, format=export_format,
+        compressed=compressed, params=params, cache_key=key
+    )
+
+    cached = db.query(ReportJob).filter(
+        ReportJob.cache_key == key,
+        ReportJob.status == ReportJobStatus.DONE,
+        ReportJob.expires_at > func.now()
+    ).order_by(ReportJob.finished_at.desc()).first()
+    if cached and artifact_path(cached).exists():
+        job.status = ReportJobStatus.DONE
+        job.cache_hit = True
+        job.file_name = cached.file_name
+        job.size_bytes = cached.size_bytes
+        job.row_count = cached.row_count
+        job.started_at = job.finished_at = func.now()
+        # The artifact is shared, so this job expires with it
+        job.expires_at = cached.expires_at
+    else:
+        in_flight = db.query(ReportJob).filter(
+            ReportJob.user_id == user.id,
+            ReportJob.cache_key == key,
+            ReportJob.status.in_([ReportJobStatus.PENDING, ReportJobStatus.RUNNING])
+        ).first()
+        if in_flight:
+            return in_flight
+
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+# =====================
+# Worker
+# =====================
+
+def claim_job(db: Session) -> Optional[ReportJob]:
+    """Take the oldest queued job; SKIP LOCKED lets several workers share the queue"""
+    queued = (
+        select(ReportJob.id)
+        .where(ReportJob.status == ReportJobStatus.PENDING)
+        .order_by(ReportJob.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job_id = db.execute(
+        update(ReportJob)
+        .where(ReportJob.id == queued.scalar_subquery())
+        .values(status=ReportJobStatus.RUNNING, attempts=ReportJob.attempts + 1, started_at=func.now())
+        .returning(ReportJob.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.commit()
+    return db.get(ReportJob, job_id) if job_id else None
+
+
+def requeue_stale(db: Session) -> int:
+    """Hand back jobs whose worker died mid-run; give up after REPORT_JOB_MAX_ATTEMPTS"""
+    stale = and_(
+        ReportJob.status == ReportJobStatus.RUNNING,
+        ReportJob.started_at < func.now() - timedelta(seconds=settings.REPORT_JOB_LEASE_SECONDS)
+    )
+    failed = db.execute(
+        update(ReportJob)
+        .where(stale, ReportJob.attempts >= settings.REPORT_JOB_MAX_ATTEMPTS)
+        .values(status=ReportJobStatus.FAILED, error="Worker stopped while generating the report", finished_at=func.now())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    requeued = db.execute(
+        update(ReportJob)
+        .where(stale)
+        .values(status=ReportJobStatus.PENDING)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return failed + requeued
+
+
+class _Counter:
+    def __init__(self, rows: Iterable[Sequence]):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self) -> Iterator[Sequence]:
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+def _write_report(out, job: ReportJob, columns, rows: Iterable[Sequence]) -> None:
+    for chunk in encode_report(job.format, columns, rows):
+        out.write(chunk.encode("utf-8"))
+
+
+def run_job(db: Session, job: ReportJob) -> None:
+    """Write the job's report to REPORT_DIR and mark it DONE (or FAILED)"""
+    directory = report_dir()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".report-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            user = db.get(User, job.user_id)
+            if not user:
+                raise ValueError("The user who requested this report no longer exists")
+            columns, rows = report_rows(db, job.report_type, user, params_to_filters(job.params))
+            counted = _Counter(rows)
+            if job.compressed:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+                    _write_report(out, job, columns, counted)
+            else:
+                _write_report(raw, job, columns, counted)
+        file_name = f"{job.id}.{EXPORT_FORMATS[job.format][1]}" + (".gz" if job.compressed else "")
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, directory / file_name)
+
+        job.status = ReportJobStatus.DONE
+        job.file_name = file_name
+        job.size_bytes = (directory / file_name).stat().st_size
+        job.row_count = counted.count
+        job.error = None
+        job.finished_at = func.now()
+        job.expires_at = func.now() + timedelta(seconds=settings.REPORT_ARTIFACT_TTL_SECONDS)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        print(f"[REPORTS] Job {job.id} failed: {error}")
+        db.execute(
+            update(ReportJob)
+            .where(ReportJob.id == job.id)
+            .values(status=ReportJobStatus.FAILED, error=error, finished_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def purge_expired(db: Session) -> int:
+    """Delete artifacts past REPORT_ARTIFACT_TTL_SECONDS; their jobs become EXPIRED"""
+    expired = db.execute(
+        update(ReportJob)
+        .where(ReportJob.status == ReportJobStatus.DONE, ReportJob.expires_at <= func.now())
+        .values(status=ReportJobStatus.EXPIRED)
+        .returning(ReportJob.file_name)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    directory = report_dir()
+    for file_name in set(filter(None, expired)):
+        (directory / file_name).unlink(missing_ok=True)
+    return len(expired)
+
+
+def run_worker(session_factory, once: bool = False) -> None:
+    """Generate queued reports, sleeping REPORT_POLL_INTERVAL_SECONDS whenever the queue is empty"""
+    while True:
+        db = session_factory()
+        try:
+            requeue_stale(db)
+            purge_expired(db)
+            while job := claim_job(db):
+                started = time.perf_counter()
+                run_job(db, job)
+                print(f"[REPORTS] {job.report_type} job {job.id}: {job.status.value} "
+                      f"({job.row_count or 0} rows, {time.perf_counter() - started:.1f}s)")
+        except Exception as e:
+            print(f"[REPORTS] Worker error: {e}")
+            db.rollback()
+        finally:
+            db.close()
+        if once:
+            return
+        time.sleep(settings.REPORT_POLL_INTERVAL_SECONDS)
@@ -0,0 +1,202 @@
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.models.invoice import Invoice
+from app.db.models.order import RentalOrder, OrderStatus
+from app.db.models.product import Product
+from app.db.models.user import User, UserRole
+
+REPORT_TYPES = ("orders", "products", "revenue")
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+# Rows per server-side cursor fetch, and per chunk written to the client
+FETCH_SIZE = 2000
+CHUNK_ROWS = 500
+REVENUE_DEFAULT_MONTHS = 12
+
+
+class ReportError(ValueError):
+    """Bad report type, format or filter; message is safe to show"""
+
+
+@dataclass
+class ReportFilters:
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None  # inclusive
+    status: Optional[OrderStatus] = None
+
+
+# (key used in NDJSON, CSV header)
+Column = Tuple[str, str]
+
+ORDER_COLUMNS: List[Column] = [
+    ("order_number", "Order Number"),
+    ("status", "Status"),
+    ("total_amount", "Total Amount"),
+    ("rental_start_date", "Rental Start"),
+    ("rental_end_date", "Rental End"),
+    ("created_at", "Created At"),
+]
+PRODUCT_COLUMNS: List[Column] = [
+    ("name", "Name"),
+    ("sales_price", "Sales Price"),
+    ("quantity_on_hand", "Quantity"),
+    ("is_published", "Is Published"),
+    ("created_at", "Created At"),
+]
+REVENUE_COLUMNS: List[Column] = [("month", "Month"), ("revenue", "Revenue")]
+
+
+def parse_filters(
+    report_type: str,
+    export_format: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[str] = None
+) -> ReportFilters:
+    if report_type not in REPORT_TYPES:
+        raise ReportError(f"Unknown report type. Use one of: {', '.join(REPORT_TYPES)}")
+    if export_format not in EXPORT_FORMATS:
+        raise ReportError(f"Unknown format. Use one of: {', '.join(EXPORT_FORMATS)}")
+    if start_date and end_date and start_date > end_date:
+        raise ReportError("start_date must not be after end_date")
+    filters = ReportFilters(start_date=start_date, end_date=end_date)
+    if status:
+        if report_type != "orders":
+            raise ReportError("The status filter applies to the orders report only")
+        try:
+            filters.status = OrderStatus(status.upper())
+        except ValueError:
+            raise ReportError("Invalid status")
+    return filters
+
+
+def _date_range(stmt, column, filters: ReportFilters):
+    if filters.start_date:
+        stmt = stmt.where(column >= datetime.combine(filters.start_date, datetime.min.time()))
+    if filters.end_date:
+        stmt = stmt.where(column < datetime.combine(filters.end_date + timedelta(days=1), datetime.min.time()))
+    return stmt
+
+
+def _stream(db: Session, stmt) -> Iterator[Sequence[Any]]:
+    # yield_per streams through a server-side cursor instead of loading every row
+    for partition in db.execute(stmt.execution_options(yield_per=FETCH_SIZE)).partitions():
+        yield from partition
+
+
+def _order_rows(db: Session, user: User, filters: ReportFilters) -> Iterator[Sequence[Any]]:
+    stmt = select(
+        RentalOrder.order_number, RentalOrder.status, RentalOrder.total_amount,
+        RentalOrder.rental_start_date, RentalOrder.rental_end_date, RentalOrder.created_at
+    )
+    if user.role == UserRole.VENDOR:
+        stmt = stmt.where(RentalOrder.vendor_id == user.id)
+    elif user.role == UserRole.CUSTOMER:
+        stmt = stmt.where(RentalOrder.customer_id == user.id)
+    if filters.status:
+        stmt = stmt.where(RentalOrder.status == filters.status)
+    stmt = _date_range(stmt, RentalOrder.created_at, filters)
+    # Newest first, walking ix_rental_orders_*created_at_id
+    return _stream(db, stmt.order_by(RentalOrder.created_at.desc(), RentalOrder.id.desc()))
+
+
+def _product_rows(db: Session, user: User, filters: ReportFilters) -> Iterator[Sequence[Any]]:
+    stmt = select(Product.name, Product.sales_price, Product.quantity_on_hand, Product.is_published, Product.created_at)
+    if user.role == UserRole.VENDOR:
+        stmt = stmt.where(Product.vendor_id == user.id)
+    stmt = _date_range(stmt, Product.created_at, filters)
+    return _stream(db, stmt.order_by(Product.created_at, Product.id))
+
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _revenue_rows(db: Session, user: User, filters: ReportFilters) -> Iterator[Sequence[Any]]:
+    """Paid invoice amounts per calendar month, one grouped query; months without revenue show 0"""
+    today = date.today()
+    last = _month_start(filters.end_date or today)
+    if filters.start_date:
+        first = _month_start(filters.start_date)
+    else:
+        first = last
+        for _ in range(REVENUE_DEFAULT_MONTHS - 1):
+            first = _month_start(first - timedelta(days=1))
+    bounded = ReportFilters(start_date=filters.start_date or first, end_date=filters.end_date)
+
+    month = func.date_trunc("month", Invoice.created_at)
+    stmt = _date_range(
+        select(month.label("month"), func.coalesce(func.sum(Invoice.paid_amount), 0)),
+        Invoice.created_at, bounded
+    ).group_by(month)
+    if user.role == UserRole.VENDOR:
+        stmt = stmt.join(RentalOrder, Invoice.order_id == RentalOrder.id).where(RentalOrder.vendor_id == user.id)
+    elif user.role == UserRole.CUSTOMER:
+        stmt = stmt.where(Invoice.customer_id == user.id)
+    totals = {row[0].date(): row[1] for row in db.execute(stmt)}
+
+    current = first
+    while current <= last:
+        yield (current.strftime("%B %Y"), totals.get(current, 0))
+        current = (current + timedelta(days=32)).replace(day=1)
+
+
+def report_rows(db: Session, report_type: str, user: User, filters: ReportFilters) -> Tuple[List[Column], Iterator[Sequence[Any]]]:
+    """Columns and a lazy row iterator for one report, scoped to what `user` may see"""
+    if report_type == "orders":
+        return ORDER_COLUMNS, _order_rows(db, user, filters)
+    if report_type == "products":
+        return PRODUCT_COLUMNS, _product_rows(db, user, filters)
+    return REVENUE_COLUMNS, _revenue_rows(db, user, filters)
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def encode_csv(columns: List[Column], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([label for _, label in columns])
+    for count, row in enumerate(rows, 1):
+        writer.writerow(["" if value is None else _cell(value) for value in row])
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_ndjson(columns: List[Column], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    keys = [key for key, _ in columns]
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps({key: _cell(value) for key, value in zip(keys, row)}))
+        if len(chunk) == CHUNK_ROWS:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson}
+
+
+def encode_report(export_format: str, columns: List[Column], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    return ENCODERS[export_format](columns, rows)
@@ -0,0 +1,75 @@
+import re
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Query, Session
+
+from app.db.models.product import Product
+
+# Must match the configuration used in PRODUCT_SEARCH_DOCUMENT
+SEARCH_CONFIG = "english"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_prefix_tsquery(search: str) -> Optional[str]:
+    """
+    Turn free text into a to_tsquery expression where every term is
+    prefix-matched, e.g. "canon eo" -> "canon:* & eo:*".
+    Only word characters survive, so user input can't inject tsquery operators.
+    """
+    tokens = _TOKEN_RE.findall(search.lower())
+    if not tokens:
+        return None
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def supports_full_text(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def apply_product_search(db: Session, query: Query, search: str) -> Tuple[Query, Optional[object]]:
+    """
+    Filter a Product query by a search string.
+    Returns the filtered query and a relevance expression to order by
+    (None when ranking isn't available on the current database).
+    """
+    tsquery_text = build_prefix_tsquery(search)
+    if tsquery_text is not None and supports_full_text(db):
+        tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+        rank = func.ts_rank_cd(Product.search_vector, tsquery)
+        return query.filter(Product.search_vector.op("@@")(tsquery)), rank
+
+    # Fallback for databases without tsvector support (e.g. local SQLite)
+    # and for searches made only of punctuation
+    return query.filter(
+        or_(
+            Product.name.ilike(f"%{search}%"),
+            Product.description.ilike(f"%{search}%")
+        )
+    ), None
+
+
+def parse_attribute_filters(pairs: Iterable[str]) -> Dict[str, Set[str]]:
+    """Parse repeated "name:value" query values into {name: {values}}"""
+    filters: Dict[str, Set[str]] = {}
+    for pair in pairs:
+        name, sep, value = pair.partition(":")
+        if not sep or not name:
+            raise ValueError("Attribute filters must look like name:value")
+        filters.setdefault(name, set()).add(value)
+    return filters
+
+
+def apply_attribute_filters(query: Query, filters: Dict[str, Set[str]]) -> Query:
+    """
+    Keep products having, for every attribute name, one of the wanted values.
+    Each check is a JSONB containment (@>) test served by the
+    ix_products_attributes GIN index.
+    """
+    if not filters:
+        return query
+    return query.filter(and_(*[
+        or_(*[Product.attributes.contains([{"name": name, "value": value}]) for value in sorted(values)])
+        for name, values in filters.items()
+    ]))
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
+
+from fastapi import HTTPException, Request, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as FormFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from app.core.config import settings
+
+UPLOAD_DIR = Path(__file__).parent.parent.parent / "uploads"
+UPLOAD_DIR.mkdir(exist_ok=True)
+
+ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+CHUNK_SIZE = 64 * 1024
+# Allowance for multipart boundaries, part headers and small form fields on top of the file
+MULTIPART_OVERHEAD = 16 * 1024
+MAX_FORM_FIELDS = 10
+
+# Request body for routes whose file comes from `image_upload` rather than File(...)
+IMAGE_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        }}},
+    }
+}
+
+# Aliases collapse to one extension so identical bytes always map to one file
+_CANONICAL_EXTENSIONS = {".jpeg": ".jpg"}
+
+
+def image_extension(filename: Optional[str]) -> str:
+    """Validate the upload's extension and return its canonical form"""
+    file_ext = Path(filename).suffix.lower() if filename else ""
+    if file_ext not in ALLOWED_IMAGE_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed: {', '.join(sorted(ALLOWED_IMAGE_EXTENSIONS))}"
+        )
+    return _CANONICAL_EXTENSIONS.get(file_ext, file_ext)
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size is {max_size // (1024 * 1024)}MB"
+    )
+
+
+class _BodyTooLarge(MultiPartException):
+    """Raised from inside the multipart parser, so it closes its spooled files"""
+
+
+async def _capped_stream(request: Request, limit: int) -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise _BodyTooLarge("Request body too large")
+        yield chunk
+
+
+def image_upload(max_size: Optional[int] = None) -> Callable[..., AsyncIterator[UploadFile]]:
+    """
+    Dependency returning the request's `file` part. File(...) lets the
+    multipart parser spool the whole body before store_image sees it; this
+    rejects a too-large Content-Length before reading anything, and stops
+    reading a body without one once it passes `max_size`. Add
+    IMAGE_UPLOAD_OPENAPI to the route so the docs still show the field.
+    """
+    async def dependency(request: Request) -> AsyncIterator[UploadFile]:
+        limit = max_size or settings.MAX_UPLOAD_SIZE_BYTES
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit + MULTIPART_OVERHEAD:
+            raise _too_large(limit)
+        if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+        parser = MultiPartParser(
+            request.headers,
+            _capped_stream(request, limit + MULTIPART_OVERHEAD),
+            max_files=1,
+            max_fields=MAX_FORM_FIELDS,
+            max_part_size=MULTIPART_OVERHEAD,
+        )
+        try:
+            form = await parser.parse()
+        except _BodyTooLarge:
+            raise _too_large(limit)
+        except MultiPartException as e:
+            raise HTTPException(status_code=400, detail=e.message)
+
+        try:
+            file = form.get("file")
+            if not isinstance(file, FormFile):
+                raise HTTPException(status_code=400, detail="No file uploaded in the 'file' field")
+            yield file
+        finally:
+            await form.close()
+
+    return dependency
+
+
+def _commit_file(tmp_path: str, final_path: Path) -> bool:
+    """Move a fully written temp file into place; False if the content already existed"""
+    if final_path.exists():
+        os.unlink(tmp_path)
+        return False
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, final_path)
+    return True
+
+
+async def store_image(file: UploadFile, max_size: Optional[int] = None) -> str:
+    """
+    Stream an uploaded image to UPLOAD_DIR under its SHA-256 digest.
+    Reads in chunks without blocking the event loop, aborts with 413 as
+    soon as `max_size` is exceeded, and renames into place only once the
+    whole body is on disk. Take `file` from `image_upload` so the request
+    body is capped before it is spooled, too. Returns the stored filename; re-uploading the
+    same bytes returns the existing file instead of writing a copy.
+    """
+    max_size = max_size or settings.MAX_UPLOAD_SIZE_BYTES
+    file_ext = image_extension(file.filename)
+
+    # Reject early when the multipart parser already knows the size
+    if file.size is not None and file.size > max_size:
+        await file.close()
+        raise _too_large(max_size)
+
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".upload-", suffix=".part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise _too_large(max_size)
+                digest.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+            await run_in_threadpool(buffer.flush)
+            await run_in_threadpool(os.fsync, buffer.fileno())
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+        filename = f"{digest.hexdigest()}{file_ext}"
+        await run_in_threadpool(_commit_file, tmp_path, UPLOAD_DIR / filename)
+        return filename
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        await file.close()
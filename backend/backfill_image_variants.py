@@ -0,0 +1,66 @@
+"""
+Backfill thumbnail/card/full variants for existing product images.
+Run from the backend directory: python backfill_image_variants.py [--force]
+
+Products whose recorded variants already cover every image are skipped
+unless --force is given. Safe to re-run: variant files are keyed by the
+content of the original upload and are only rendered once.
+"""
+
+import sys
+import os
+import argparse
+
+# Add the app to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.db.models.product import Product
+from app.services.image_service import build_variants, local_filename, shutdown_executor, variants_enabled
+
+BATCH_SIZE = 100
+
+
+def needs_variants(product: Product) -> bool:
+    recorded = product.image_variants or {}
+    return any(local_filename(url) and url not in recorded for url in product.images or [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill product image variants")
+    parser.add_argument("--force", action="store_true", help="Re-record variants for every product with images")
+    args = parser.parse_args()
+
+    if not variants_enabled():
+        print("Image variants are disabled (Pillow missing or IMAGE_VARIANT_WORKERS=0)")
+        return
+
+    db = SessionLocal()
+    updated = 0
+    try:
+        products = db.query(Product).filter(Product.images.isnot(None)).order_by(Product.id).all()
+        pending = [p for p in products if args.force or needs_variants(p)]
+        print(f"{len(pending)} of {len(products)} products need variants")
+
+        for start in range(0, len(pending), BATCH_SIZE):
+            batch = pending[start:start + BATCH_SIZE]
+            # One pool round per batch so images render in parallel across products
+            variants = build_variants(url for product in batch for url in product.images or [])
+            for product in batch:
+                product.image_variants = {url: variants[url] for url in product.images or [] if url in variants}
+                updated += 1
+            db.commit()
+            print(f"  {min(start + BATCH_SIZE, len(pending))}/{len(pending)}")
+
+        print(f"Recorded variants for {updated} products")
+    except Exception as e:
+        db.rollback()
+        print(f"\nError: {e}")
+        raise
+    finally:
+        db.close()
+        shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark attribute filtering on a large synthetic catalog.
+Run from the backend directory: python benchmark_attributes.py [--products 200000] [--keep]
+
+Inserts products owned by a throwaway vendor, times the attribute filter used by
+GET /api/products?attribute=name:value with the GIN index and with index scans
+disabled (the sequential-scan baseline), then deletes everything it created
+unless --keep is given. Point DATABASE_URL at a scratch database.
+"""
+
+import sys
+import os
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+# Add the app to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import insert, text
+from app.db.session import SessionLocal
+from app.db.models.product import Product
+from app.db.models.user import User, UserRole
+from app.services.search_service import apply_attribute_filters
+
+BRANDS = ["Canon", "Nikon", "Sony", "Fujifilm", "Panasonic", "GoPro", "DJI", "Bose", "JBL", "Apple",
+          "Samsung", "Dell", "HP", "Lenovo", "Quechua", "Decathlon", "Coleman", "Wildcraft", "Bosch", "Makita"]
+COLORS = ["Black", "White", "Silver", "Red", "Blue", "Green", "Grey", "Yellow"]
+CONDITIONS = ["New", "Like New", "Good", "Fair"]
+
+BATCH_SIZE = 5000
+RUNS = 15
+
+
+def seed(db, vendor_id, count):
+    print(f"Seeding {count} products...")
+    started = time.perf_counter()
+    for offset in range(0, count, BATCH_SIZE):
+        rows = []
+        for i in range(offset, min(offset + BATCH_SIZE, count)):
+            rows.append({
+                "id": uuid.uuid4(),
+                "vendor_id": vendor_id,
+                "name": f"Bench product {i}",
+                "is_rentable": True,
+                "rental_price_daily": random.randint(100, 10000),
+                "quantity_on_hand": random.randint(0, 20),
+                "reserved_quantity": 0,
+                "is_published": True,
+                "attributes": [
+                    {"name": "brand", "value": random.choice(BRANDS)},
+                    {"name": "color", "value": random.choice(COLORS)},
+                    {"name": "condition", "value": random.choice(CONDITIONS)},
+                    {"name": "sku", "value": f"SKU-{i:07d}"},
+                ],
+            })
+        db.execute(insert(Product), rows)
+        db.commit()
+    db.execute(text("ANALYZE products"))
+    db.commit()
+    print(f"  done in {time.perf_counter() - started:.1f}s")
+
+
+def explain(db, query):
+    dialect = db.get_bind().dialect
+    compiled = query.statement.compile(dialect=dialect)
+    params = {}
+    for name, value in compiled.params.items():
+        process = compiled.binds[name].type.bind_processor(dialect)
+        params[name] = process(value) if process else value
+    result = db.connection().exec_driver_sql("EXPLAIN " + str(compiled), params)
+    return [row[0] for row in result]
+
+
+def time_query(db, filters, use_index):
+    db.execute(text("SET enable_bitmapscan = %s" % ("on" if use_index else "off")))
+    db.execute(text("SET enable_indexscan = %s" % ("on" if use_index else "off")))
+    query = apply_attribute_filters(db.query(Product.id), filters).limit(50)
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        rows = query.all()
+        timings.append((time.perf_counter() - started) * 1000)
+    plan = explain(db, query)
+    db.execute(text("RESET enable_bitmapscan"))
+    db.execute(text("RESET enable_indexscan"))
+    return statistics.median(timings), len(rows), plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--keep", action="store_true", help="Leave the seeded products in place")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    vendor = User(
+        first_name="Bench",
+        last_name="Vendor",
+        email=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+        password_hash="!",
+        role=UserRole.VENDOR,
+        is_active=True
+    )
+    db.add(vendor)
+    db.commit()
+
+    try:
+        seed(db, vendor.id, args.products)
+
+        cases = {
+            "selective (sku)": {"sku": {f"SKU-{args.products // 2:07d}"}},
+            "brand": {"brand": {"Canon"}},
+            "brand + color": {"brand": {"Canon"}, "color": {"Red"}},
+            "brand in (2) + condition": {"brand": {"Canon", "Nikon"}, "condition": {"New"}},
+        }
+        print(f"\nMedian of {RUNS} runs, first page (LIMIT 50):")
+        print(f"{'filter':<28}{'GIN index':>12}{'seq scan':>12}{'rows':>6}")
+        for label, filters in cases.items():
+            indexed_ms, rows, plan = time_query(db, filters, use_index=True)
+            scan_ms, _, _ = time_query(db, filters, use_index=False)
+            print(f"{label:<28}{indexed_ms:>10.2f}ms{scan_ms:>10.2f}ms{rows:>6}")
+        print("\nPlan for the last case with the index:")
+        for line in plan:
+            print("  " + line)
+    finally:
+        if not args.keep:
+            print("\nCleaning up...")
+            db.rollback()
+            db.query(Product).filter(Product.vendor_id == vendor.id).delete(synchronize_session=False)
+            db.delete(vendor)
+            db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Check that the return-status filters use their partial indexes on a large order table.
+Run from the backend directory: python benchmark_return_indexes.py [--orders 1000000] [--keep]
+
+Seeds orders for throwaway vendors and customers, then EXPLAINs and times the
+"approaching" filter of GET /api/orders and the pending_returns count of
+/api/dashboard/stats for vendor, customer and admin scopes, with the indexes
+and with index scans disabled (the sequential-scan baseline). Exits non-zero
+if any plan stops using its index, so it can be rerun after schema or query
+changes. Deletes everything it created unless --keep is given. Point
+DATABASE_URL at a scratch database.
+"""
+
+import sys
+import os
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+# Add the app to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, insert, text
+from app.db.session import SessionLocal
+from app.db.models.order import RentalOrder
+from app.db.models.user import User, UserRole
+from app.api.pagination import apply_keyset
+from app.services.overdue_service import approaching_return_filter, pending_return_filter
+
+BATCH_SIZE = 100_000
+RUNS = 10
+
+# Mostly finished orders, as in a long-running marketplace; about 1 in 3
+# open orders already has a return date scheduled
+SEED_SQL = """
+INSERT INTO rental_orders (
+    id, order_number, customer_id, vendor_id, status, subtotal, tax_rate, tax_amount,
+    security_deposit, total_amount, paid_amount, rental_start_date, rental_end_date,
+    return_date, late_return_fee, overdue_days, accrued_late_fee, created_at, updated_at
+)
+SELECT
+    gen_random_uuid(), 'BENCH-' || g,
+    (CAST(:customers AS uuid[]))[1 + g % cardinality(CAST(:customers AS uuid[]))],
+    (CAST(:vendors AS uuid[]))[1 + g % cardinality(CAST(:vendors AS uuid[]))],
+    s.status::orderstatus, 1000, 18, 180, 0, 1180, 0,
+    created, created + interval '3 days',
+    CASE
+        WHEN s.status IN ('RETURNED', 'COMPLETED') THEN created + interval '3 days'
+        WHEN s.status <> 'CANCELLED' AND scheduled < 0.33 THEN now() + (random() * 20 - 10) * interval '1 day'
+    END,
+    0, 0, 0, created, created
+FROM (
+    -- Per-row random draws; a LATERAL without a reference to g would run only once
+    SELECT g, random() AS r, random() AS scheduled, now() - random() * interval '730 days' AS created
+    FROM generate_series(:first, :last) AS g
+) AS c
+CROSS JOIN LATERAL (SELECT CASE
+    WHEN c.r < 0.70 THEN 'COMPLETED'
+    WHEN c.r < 0.78 THEN 'CANCELLED'
+    WHEN c.r < 0.83 THEN 'RETURNED'
+    WHEN c.r < 0.88 THEN 'PENDING'
+    WHEN c.r < 0.92 THEN 'CONFIRMED'
+    WHEN c.r < 0.97 THEN 'PICKED_UP'
+    ELSE 'ACTIVE'
+END AS status) AS s
+"""
+
+
+def make_users(db, role, count):
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "first_name": "Bench",
+            "last_name": role.value.title(),
+            "email": f"bench-{uuid.uuid4().hex[:12]}@example.com",
+            "password_hash": "!",
+            "role": role,
+            "is_active": True,
+        }
+        for _ in range(count)
+    ]
+    db.execute(insert(User), rows)
+    db.commit()
+    return [row["id"] for row in rows]
+
+
+def seed(db, vendors, customers, count):
+    print(f"Seeding {count} orders...")
+    started = time.perf_counter()
+    params = {"vendors": [str(v) for v in vendors], "customers": [str(c) for c in customers]}
+    for first in range(1, count + 1, BATCH_SIZE):
+        db.execute(text(SEED_SQL), {**params, "first": first, "last": min(first + BATCH_SIZE - 1, count)})
+        db.commit()
+    # Vacuum as autovacuum would on a live table, so the visibility map allows index-only scans
+    with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE rental_orders"))
+    print(f"  done in {time.perf_counter() - started:.1f}s")
+
+
+def explain(db, query):
+    # psycopg2 interpolates parameters client-side, so literal binds give the planner the same query
+    compiled = query.statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    return [row[0] for row in db.execute(text("EXPLAIN " + str(compiled)))]
+
+
+def set_index_scans(db, enabled):
+    for setting in ("enable_indexscan", "enable_indexonlyscan", "enable_bitmapscan"):
+        db.execute(text(f"SET {setting} = {'on' if enabled else 'off'}"))
+
+
+def time_query(db, run):
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--vendors", type=int, default=50)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--keep", action="store_true", help="Leave the seeded orders and users in place")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    vendors = make_users(db, UserRole.VENDOR, args.vendors)
+    customers = make_users(db, UserRole.CUSTOMER, args.customers)
+    failed = False
+
+    try:
+        seed(db, vendors, customers, args.orders)
+        now = datetime.now()
+        approaching = db.query(RentalOrder.id).filter(approaching_return_filter(now))
+        pending = db.query(RentalOrder.id).filter(pending_return_filter(now))
+
+        # (label, query, how it runs, index the plan must use)
+        cases = [
+            ("approaching, vendor", approaching.filter(RentalOrder.vendor_id == vendors[0]),
+             "page", "ix_rental_orders_vendor_open_return_created_at_id"),
+            ("approaching, customer", approaching.filter(RentalOrder.customer_id == customers[0]),
+             "page", "ix_rental_orders_customer_open_return_created_at_id"),
+            ("approaching, admin", approaching, "page", "ix_rental_orders_open_return_created_at_id"),
+            ("pending count, vendor", pending.filter(RentalOrder.vendor_id == vendors[0]),
+             "count", "ix_rental_orders_vendor_pending_return"),
+            ("pending count, customer", pending.filter(RentalOrder.customer_id == customers[0]),
+             "count", "ix_rental_orders_customer_pending_return"),
+            ("pending count, admin", pending, "count", "ix_rental_orders_pending_return"),
+        ]
+
+        print(f"\nMedian of {RUNS} runs (pages are LIMIT 50, newest first):")
+        print(f"{'query':<26}{'indexed':>12}{'seq scan':>12}{'rows':>8}  plan")
+        for label, query, mode, index in cases:
+            if mode == "page":
+                query = apply_keyset(query, RentalOrder, None).limit(50)
+                run = query.all
+                plan_query = query
+            else:
+                run = query.count
+                plan_query = query.with_entities(func.count())
+
+            rows = run()
+            rows = rows if isinstance(rows, int) else len(rows)
+            indexed_ms = time_query(db, run)
+            plan = explain(db, plan_query)
+            set_index_scans(db, False)
+            scan_ms = time_query(db, run)
+            set_index_scans(db, True)
+
+            uses_index = any(index in line for line in plan)
+            failed |= not uses_index
+            print(f"{label:<26}{indexed_ms:>10.2f}ms{scan_ms:>10.2f}ms{rows:>8}  "
+                  f"{'uses ' + index if uses_index else 'MISSING ' + index}")
+            if not uses_index:
+                for line in plan:
+                    print("    " + line)
+
+        print("\nFAIL: a return-status query no longer uses its index" if failed else "\nPASS: every query uses its index")
+    finally:
+        if not args.keep:
+            print("\nCleaning up...")
+            db.rollback()
+            db.query(RentalOrder).filter(RentalOrder.vendor_id.in_(vendors)).delete(synchronize_session=False)
+            db.query(User).filter(User.id.in_(vendors + customers)).delete(synchronize_session=False)
+            db.commit()
+        db.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
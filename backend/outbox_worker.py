@@ -0,0 +1,36 @@
+"""
+Outbox worker: sends the emails and wallet credits that API requests
+queue in the outbox_messages table.
+Run from the backend directory: python outbox_worker.py [--once]
+
+Run one or more alongside the API server; workers share the table safely.
+Failed messages are retried with exponential backoff and marked DEAD after
+OUTBOX_MAX_ATTEMPTS; list and requeue those via /api/admin/outbox.
+"""
+
+import sys
+import os
+import argparse
+
+# Add the app to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.services.outbox_service import run_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain the side-effect outbox")
+    parser.add_argument("--once", action="store_true", help="Process everything due, then exit")
+    args = parser.parse_args()
+
+    print("Outbox worker started")
+    try:
+        run_worker(SessionLocal, once=args.once)
+    except KeyboardInterrupt:
+        pass
+    print("Outbox worker stopped")
+
+
+if __name__ == "__main__":
+    main()
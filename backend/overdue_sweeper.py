@@ -0,0 +1,55 @@
+"""
+Overdue sweeper: recomputes overdue days and accrued late fees for orders
+still out past their rental end date, and queues reminder emails.
+Run from the backend directory: python overdue_sweeper.py [--once]
+
+Sweeps every OVERDUE_SWEEP_INTERVAL_SECONDS. Reminders go through the
+outbox, so run outbox_worker.py as well.
+"""
+
+import sys
+import os
+import argparse
+import time
+
+# Add the app to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.overdue_service import sweep_overdue
+
+
+def sweep_once():
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        result = sweep_overdue(db)
+        print(
+            f"Overdue sweep: {result.updated} updated, {result.cleared} cleared, "
+            f"{result.reminders} reminders queued ({time.perf_counter() - started:.2f}s)"
+        )
+    except Exception as e:
+        db.rollback()
+        print(f"Overdue sweep failed: {e}")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accrue late fees on overdue rentals")
+    parser.add_argument("--once", action="store_true", help="Sweep once, then exit")
+    args = parser.parse_args()
+
+    try:
+        while True:
+            sweep_once()
+            if args.once:
+                break
+            time.sleep(settings.OVERDUE_SWEEP_INTERVAL_SECONDS)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
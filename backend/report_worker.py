@@ -0,0 +1,37 @@
+"""
+Report worker: generates the report files that POST /api/dashboard/reports/jobs
+queues in the report_jobs table, and deletes them once they expire.
+Run from the backend directory: python report_worker.py [--once]
+
+Run one or more alongside the API server; workers share the table safely.
+Files are written to REPORT_DIR and kept for REPORT_ARTIFACT_TTL_SECONDS.
+A job whose worker stops mid-run is retried after REPORT_JOB_LEASE_SECONDS,
+up to REPORT_JOB_MAX_ATTEMPTS times.
+"""
+
+import sys
+import os
+import argparse
+
+# Add the app to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.services.report_job_service import run_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate queued report files")
+    parser.add_argument("--once", action="store_true", help="Generate everything queued, then exit")
+    args = parser.parse_args()
+
+    print("Report worker started")
+    try:
+        run_worker(SessionLocal, once=args.once)
+    except KeyboardInterrupt:
+        pass
+    print("Report worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Concurrent checkout stress test for POST /api/orders.
+Run from the backend directory: python stress_checkout.py [--carts 80] [--workers 16] [--lines 3]
+
+Creates a throwaway vendor, customer and a few low-stock products, fires
+many overlapping carts at create_order from parallel threads, then checks
+that no product ended up with more units reserved than it has on hand and
+that reserved_quantity matches the reservations. Everything it created is
+deleted afterwards. Point DATABASE_URL at a scratch database.
+"""
+
+import sys
+import os
+import argparse
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the app to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from app.main import app
+from app.db.session import SessionLocal
+from app.db.models.order import RentalOrder, OrderLine
+from app.db.models.product import Product
+from app.db.models.reservation import Reservation, ReservationStatus
+from app.db.models.user import User, UserRole
+from app.services.auth_service import create_access_token
+
+START = "2030-01-01T10:00:00Z"
+END = "2030-01-03T10:00:00Z"
+
+
+def make_user(db, role):
+    user = User(
+        first_name="Stress",
+        last_name=role.value.title(),
+        email=f"stress-{uuid.uuid4().hex[:8]}@example.com",
+        password_hash="!",
+        role=role,
+        is_active=True
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent checkout stress test")
+    parser.add_argument("--carts", type=int, default=80)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--products", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=6)
+    parser.add_argument("--lines", type=int, default=3, help="Maximum lines per cart")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    vendor = make_user(db, UserRole.VENDOR)
+    customer = make_user(db, UserRole.CUSTOMER)
+    products = [
+        Product(
+            vendor_id=vendor.id,
+            name=f"Stress product {i}",
+            is_rentable=True,
+            rental_price_daily=100,
+            quantity_on_hand=args.stock,
+            reserved_quantity=0,
+            is_published=True,
+            attributes=[]
+        )
+        for i in range(args.products)
+    ]
+    db.add_all(products)
+    db.commit()
+    product_ids = [str(p.id) for p in products]
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": str(customer.id)})}
+
+    random.seed(42)
+    carts = []
+    for _ in range(args.carts):
+        # Random products in random order, so lock ordering actually matters
+        chosen = random.sample(product_ids, random.randint(1, min(args.lines, len(product_ids))))
+        carts.append({
+            "vendor_id": str(vendor.id),
+            "lines": [
+                {
+                    "product_id": pid,
+                    "quantity": 1,
+                    "rental_period": {"type": "day", "start_date": START, "end_date": END, "quantity": 1}
+                }
+                for pid in chosen
+            ]
+        })
+
+    client = TestClient(app)
+    statuses = Counter()
+
+    def checkout(cart):
+        response = client.post("/api/orders", json=cart, headers=headers)
+        return response.status_code
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            for status_code in pool.map(checkout, carts):
+                statuses[status_code] += 1
+        elapsed = time.perf_counter() - started
+
+        print(f"{args.carts} carts, {args.workers} workers: {elapsed:.2f}s ({args.carts / elapsed:.1f} checkouts/s)")
+        print(f"Responses: {dict(statuses)}")
+
+        db.expire_all()
+        held = dict(db.query(Reservation.product_id, func.sum(Reservation.quantity)).filter(
+            Reservation.product_id.in_([p.id for p in products]),
+            Reservation.status == ReservationStatus.ACTIVE
+        ).group_by(Reservation.product_id).all())
+        oversold = False
+        for product in db.query(Product).filter(Product.vendor_id == vendor.id).order_by(Product.name):
+            reserved = held.get(product.id, 0)
+            ok = reserved <= product.quantity_on_hand and reserved == product.reserved_quantity
+            oversold |= not ok
+            print(f"  {product.name}: on hand {product.quantity_on_hand}, reservations {reserved}, "
+                  f"reserved_quantity {product.reserved_quantity} {'OK' if ok else 'MISMATCH'}")
+        print("FAIL: oversold or lost updates" if oversold else "PASS: no oversell, no lost updates")
+    finally:
+        order_ids = [o for (o,) in db.query(RentalOrder.id).filter(RentalOrder.vendor_id == vendor.id)]
+        db.query(Reservation).filter(Reservation.order_id.in_(order_ids)).delete(synchronize_session=False)
+        db.query(OrderLine).filter(OrderLine.order_id.in_(order_ids)).delete(synchronize_session=False)
+        db.query(RentalOrder).filter(RentalOrder.id.in_(order_ids)).delete(synchronize_session=False)
+        db.query(Product).filter(Product.vendor_id == vendor.id).delete(synchronize_session=False)
+        db.query(User).filter(User.id.in_([vendor.id, customer.id])).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
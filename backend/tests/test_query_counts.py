@@ -0,0 +1,201 @@
+"""
+Query budgets for the list and detail endpoints that serialize products,
+orders, invoices and quotations (the loader profiles in app/db/loaders.py).
+Run from the backend directory: python -m pytest tests
+
+Each endpoint must run a fixed number of statements, the auth lookup
+included, however many rows it returns: a lazy relationship sneaking back
+into a serializer shows up as a list page costing more than a one-row page.
+Seeds a vendor, a customer and a few documents of each kind through the API
+and deletes them afterwards. Point DATABASE_URL at a migrated scratch
+database; the tests are skipped when it is unset, cannot be reached or has
+no schema.
+"""
+
+import sys
+import os
+import uuid
+from contextlib import contextmanager
+
+# Add the app to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from pydantic import ValidationError
+
+try:
+    from app.core.config import settings  # noqa: F401 (fails without DATABASE_URL)
+except ValidationError:
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert, text
+from sqlalchemy.exc import DBAPIError
+
+from app.main import app
+from app.db.session import SessionLocal, engine
+from app.db.models.product import Category
+from app.db.models.user import User, UserRole
+from app.services.auth_service import create_access_token
+
+ROWS = 4
+LINES_PER_DOCUMENT = 2
+
+# (path, statements) with the seeded ids filled in. Products are public: one
+# query with vendor and category joined. The others add the auth lookup and
+# one selectinload of the lines.
+LIST_BUDGETS = [
+    ("/api/products?vendor_id={vendor_id}", 1),
+    ("/api/orders", 3),
+    ("/api/invoices", 3),
+    ("/api/quotations", 3),
+]
+DETAIL_BUDGETS = [
+    ("/api/products/{product_id}", 1),
+    ("/api/orders/{order_id}", 3),
+    ("/api/invoices/{invoice_id}", 3),
+    ("/api/quotations/{quotation_id}", 3),
+]
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def make_user(db, role):
+    user_id = uuid.uuid4()
+    db.execute(insert(User).values(
+        id=user_id,
+        first_name="Query",
+        last_name=role.value.title(),
+        email=f"query-count-{uuid.uuid4().hex[:12]}@example.com",
+        password_hash="!",
+        role=role,
+        is_active=True,
+    ))
+    return user_id
+
+
+def auth(user_id):
+    return {"Authorization": "Bearer " + create_access_token({"sub": str(user_id)})}
+
+
+def rental_line(product_id, day):
+    return {
+        "product_id": product_id,
+        "quantity": 1,
+        "rental_period": {
+            "type": "day",
+            "start_date": f"2030-01-{day:02d}T00:00:00Z",
+            "end_date": f"2030-01-{day + 1:02d}T00:00:00Z",
+            "quantity": 1,
+        },
+    }
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1 FROM users LIMIT 0"))
+    except DBAPIError as e:
+        db.close()
+        pytest.skip(f"Database not reachable or not migrated: {e.orig}")
+
+    vendor_id = make_user(db, UserRole.VENDOR)
+    customer_id = make_user(db, UserRole.CUSTOMER)
+    category_id = uuid.uuid4()
+    db.execute(insert(Category).values(id=category_id, name=f"Query count {category_id.hex[:8]}", is_active=True))
+    db.commit()
+
+    client = TestClient(app)
+    vendor, customer = auth(vendor_id), auth(customer_id)
+    ids = {"vendor_id": vendor_id}
+    try:
+        products = [
+            client.post("/api/products", headers=vendor, json={
+                "name": f"Query count {i}",
+                "category_id": str(category_id),
+                "quantity_on_hand": 100,
+                "is_published": True,
+                "rental_pricing": {"daily": 10},
+            }).json()["id"]
+            for i in range(ROWS)
+        ]
+        orders, quotations, invoices = [], [], []
+        for i in range(ROWS):
+            lines = [rental_line(products[(i + n) % ROWS], 1 + n * 2) for n in range(LINES_PER_DOCUMENT)]
+            order = client.post("/api/orders", headers=customer, json={"vendor_id": str(vendor_id), "lines": lines})
+            assert order.status_code == 200, order.text
+            orders.append(order.json()["id"])
+            quotation = client.post("/api/quotations", headers=customer, json={"lines": lines})
+            assert quotation.status_code == 200, quotation.text
+            quotations.append(quotation.json()[0]["id"])  # one quotation per vendor
+            invoice = client.post("/api/invoices", headers=vendor, json={
+                "order_id": orders[-1],
+                "lines": [
+                    {"description": f"Line {n}", "quantity": 1, "unit_price": 10, "total_price": 10}
+                    for n in range(LINES_PER_DOCUMENT)
+                ],
+            })
+            assert invoice.status_code == 200, invoice.text
+            invoices.append(invoice.json()["id"])
+        ids.update(product_id=products[0], order_id=orders[0], invoice_id=invoices[0], quotation_id=quotations[0])
+
+        yield client, customer, ids
+    finally:
+        db.rollback()
+        params = {"users": [vendor_id, customer_id]}
+        for statement in (
+            "DELETE FROM payments WHERE invoice_id IN (SELECT id FROM invoices WHERE customer_id = ANY(:users))",
+            "DELETE FROM invoice_lines WHERE invoice_id IN (SELECT id FROM invoices WHERE customer_id = ANY(:users))",
+            "DELETE FROM invoices WHERE customer_id = ANY(:users)",
+            "DELETE FROM reservations WHERE product_id IN (SELECT id FROM products WHERE vendor_id = ANY(:users))",
+            "DELETE FROM order_lines WHERE order_id IN (SELECT id FROM rental_orders WHERE customer_id = ANY(:users))",
+            "DELETE FROM rental_orders WHERE customer_id = ANY(:users)",
+            "DELETE FROM quotation_lines WHERE quotation_id IN (SELECT id FROM quotations WHERE customer_id = ANY(:users))",
+            "DELETE FROM quotations WHERE customer_id = ANY(:users)",
+            "DELETE FROM products WHERE vendor_id = ANY(:users)",
+            "DELETE FROM users WHERE id = ANY(:users)",
+        ):
+            db.execute(text(statement), params)
+        db.execute(text("DELETE FROM categories WHERE id = :id"), {"id": category_id})
+        db.commit()
+        db.close()
+
+
+def query_count(client, headers, path):
+    with count_queries() as statements:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()
+
+
+@pytest.mark.parametrize("path, budget", LIST_BUDGETS)
+def test_list_query_count_is_fixed(seeded, path, budget):
+    client, headers, ids = seeded
+    path = path.format(**ids)
+    separator = "&" if "?" in path else "?"
+
+    one_row, _ = query_count(client, headers, f"{path}{separator}limit=1")
+    full_page, rows = query_count(client, headers, f"{path}{separator}limit={ROWS}")
+
+    assert len(rows) == ROWS
+    assert full_page == one_row == budget
+
+
+@pytest.mark.parametrize("path, budget", DETAIL_BUDGETS)
+def test_detail_query_count_is_fixed(seeded, path, budget):
+    client, headers, ids = seeded
+    count, _ = query_count(client, headers, path.format(**ids))
+    assert count == budget